@@ -2,22 +2,37 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog, colorchooser
 import os
 import logging
-from PIL import Image, ImageTk
-import re
-from data_handler import load_dungeon_data, save_dungeon_data, load_themes, save_themes, load_preferences, save_preferences, update_status_in_data, get_image_path
-from theme_manager import apply_theme, update_locked_state, apply_theme_to_new_window, apply_even_odd_tags
-from language_manager import change_language, load_language, get_supported_languages
-
-# Initialize logging
-logging.basicConfig(filename='app.log', level=logging.DEBUG,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+from collections import deque
+from data_handler import load_dungeon_data, load_themes, save_themes, load_preferences, save_preferences, get_image_path, PREFERENCES_FILE, PROFILES_FILE
+from theme_manager import apply_theme, apply_theme_to_new_window, stripe_rows
+from language_manager import change_language, load_language, get_supported_languages, bind_text, bind_menu_label, bind_heading
+from tree_reconciler import TreeReconciler
+from persistence import PersistenceService, DEFAULT_SAVE_DELAY
+from sqlite_store import is_sqlite_path
+from virtual_tree import VirtualTreeview
+from image_service import ImageService, Prefetcher
+from tracker_model import TrackerModel
+from profile_store import ProfileStore
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Number of duties from which the virtual tree is used unless the preferences say otherwise
+VIRTUAL_TREE_THRESHOLD = 2000
+# Number of items inserted by Expand All before it yields to the event loop
+EXPAND_BATCH_ROWS = 200
+# Item id suffix of the placeholder child shown under nodes whose children were not inserted yet
+PLACEHOLDER_SUFFIX = ":placeholder"
+# Fraction of the screen size quest info images are scaled down to fit in
+INFO_IMAGE_SCALE = 0.9
+# Number of duties on each side of the selected or hovered one whose info images are prefetched
+PREFETCH_NEIGHBORS = 3
 
 
 class DungeonTracker(tk.Tk):
     def __init__(self, data, data_file, image_folder, themes_file, language_file):
         super().__init__()
-        logging.info("Initializing DungeonTracker application.")
-        self.title("Dungeon Soup - FFXIV Duty Tracker")
+        logger.info("Initializing DungeonTracker application.")
         self.geometry("1000x700")
 
         # Initialization of necessary variables
@@ -28,11 +43,31 @@ class DungeonTracker(tk.Tk):
 
         # Load themes and preferences
         self.themes = load_themes(themes_file)
-        self.preferences = load_preferences()
+        # Preferences live in the database when the data is stored in SQLite
+        self.preferences_file = data_file if is_sqlite_path(data_file) else PREFERENCES_FILE
+        self.preferences = load_preferences(self.preferences_file)
+
+        # Save changes to the data file in the background, coalescing bursts of changes
+        self.persistence = PersistenceService(data_file, data, delay=self.preferences.get('save_delay', DEFAULT_SAVE_DELAY))
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Filtering, searching and status changes live in the model, the window only renders its events
+        self.model = TrackerModel(data, self.persistence, data_file if is_sqlite_path(data_file) else None)
+        self.model.subscribe("layout", self.render_layout)
+        self.model.subscribe("status", self.render_status)
+        # Other characters are kept as small bitmaps over the same catalog
+        self.profiles = ProfileStore(self.model, data_file if is_sqlite_path(data_file) else PROFILES_FILE)
+        self.update_title()
+
+        # Decode quest info images off the Tk thread and keep recently used ones
+        self.image_service = ImageService(self, image_folder)
+        self.prefetcher = Prefetcher(self.image_service)
+        self.hover_row = ""
+
         self.current_theme = self.preferences.get('current_theme', list(self.themes.keys())[0] if self.themes else "default")
         self.custom_theme = None
 
-        logging.info(f"Loaded theme: {self.current_theme}")
+        logger.info(f"Loaded theme: {self.current_theme}")
 
         # Load language settings
         self.language = load_language(language_file)
@@ -47,19 +82,20 @@ class DungeonTracker(tk.Tk):
         # Apply the current theme
         apply_theme(self, self.themes.get(self.current_theme, self.default_theme()))
 
-        # Apply the initial locked state colors
-        update_locked_state(self.tree)
+        logger.info("DungeonTracker initialization complete.")
 
-        logging.info("DungeonTracker initialization complete.")
+    def update_title(self):
+        self.title(f"Dungeon Soup - FFXIV Duty Tracker ({self.profiles.current})")
 
     def create_widgets(self):
-        logging.info("Creating UI widgets.")
+        logger.info("Creating UI widgets.")
         self.create_menu()
 
         control_frame = tk.Frame(self)
         control_frame.pack(fill=tk.X, padx=10, pady=5)
 
-        search_label = tk.Label(control_frame, text=self.language.get("label_search", "Search"))
+        search_label = tk.Label(control_frame)
+        bind_text(search_label, self.language, "label_search", "Search")
         search_label.pack(side=tk.LEFT)
 
         self.search_var = tk.StringVar()
@@ -67,29 +103,36 @@ class DungeonTracker(tk.Tk):
         search_entry = tk.Entry(control_frame, textvariable=self.search_var)
         search_entry.pack(fill=tk.X, expand=True, side=tk.LEFT, padx=5)
 
-        reset_button = tk.Button(control_frame, text=self.language.get("button_reset", "Reset"), command=self.reset_status)
+        reset_button = tk.Button(control_frame, command=self.reset_status)
+        bind_text(reset_button, self.language, "button_reset", "Reset")
         reset_button.pack(side=tk.LEFT, padx=5)
 
-        clear_filters_button = tk.Button(control_frame, text=self.language.get("button_clear_filters", "Clear Filters"), command=self.clear_filters)
+        clear_filters_button = tk.Button(control_frame, command=self.clear_filters)
+        bind_text(clear_filters_button, self.language, "button_clear_filters", "Clear Filters")
         clear_filters_button.pack(side=tk.LEFT, padx=5)
 
-        expand_button = tk.Button(control_frame, text=self.language.get("button_expand_all", "Expand All"), command=self.expand_all)
+        expand_button = tk.Button(control_frame, command=self.expand_all)
+        bind_text(expand_button, self.language, "button_expand_all", "Expand All")
         expand_button.pack(side=tk.LEFT, padx=5)
 
-        collapse_button = tk.Button(control_frame, text=self.language.get("button_collapse_all", "Collapse All"), command=self.collapse_all)
+        collapse_button = tk.Button(control_frame, command=self.collapse_all)
+        bind_text(collapse_button, self.language, "button_collapse_all", "Collapse All")
         collapse_button.pack(side=tk.LEFT, padx=5)
 
-        filter_button = tk.Button(control_frame, text=self.language.get("button_filters", "Filters"), command=self.toggle_filters)
+        filter_button = tk.Button(control_frame, command=self.toggle_filters)
+        bind_text(filter_button, self.language, "button_filters", "Filters")
         filter_button.pack(side=tk.LEFT, padx=5)
 
-        toggle_theme_button = tk.Button(control_frame, text=self.language.get("button_toggle_theme", "Toggle Theme"), command=self.open_theme_selector)
+        toggle_theme_button = tk.Button(control_frame, command=self.open_theme_selector)
+        bind_text(toggle_theme_button, self.language, "button_toggle_theme", "Toggle Theme")
         toggle_theme_button.pack(side=tk.LEFT, padx=5)
 
         self.filter_frame = tk.Frame(self)
         self.filter_frame.pack(fill=tk.X, padx=10, pady=5)
         self.filter_frame.pack_forget()  # Hide by default
 
-        filter_label = tk.Label(self.filter_frame, text=self.language.get("label_filters", "Filters:"))
+        filter_label = tk.Label(self.filter_frame)
+        bind_text(filter_label, self.language, "label_filters", "Filters:")
         filter_label.pack(side=tk.TOP, anchor=tk.W)
 
         self.filters = {
@@ -105,7 +148,8 @@ class DungeonTracker(tk.Tk):
         for category, items in self.filter_vars.items():
             cat_frame = tk.Frame(self.filter_frame)
             cat_frame.pack(side=tk.LEFT, padx=10)
-            cat_label = tk.Label(cat_frame, text=self.language.get(category, category) + ":")
+            cat_label = tk.Label(cat_frame)
+            bind_text(cat_label, self.language, category, category, lambda text, label=cat_label: label.configure(text=text + ":"))
             cat_label.pack(side=tk.TOP, anchor=tk.W)
             for item, var in items.items():
                 chk = tk.Checkbutton(cat_frame, text=item, variable=var, command=self.on_filter_change)
@@ -115,18 +159,28 @@ class DungeonTracker(tk.Tk):
         tree_scroll = tk.Scrollbar(self, orient=tk.VERTICAL)
         tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.tree = ttk.Treeview(self, columns=("Level", "Unlock", "Status"), show="tree headings")
+        # Large catalogs use the virtual tree, which only creates Tk rows for the visible viewport
+        if self.use_virtual_tree():
+            self.tree = VirtualTreeview(self, columns=("Level", "Unlock", "Status"), show="tree headings",
+                                        yscrollcommand=tree_scroll.set)
+        else:
+            self.tree = ttk.Treeview(self, columns=("Level", "Unlock", "Status"), show="tree headings",
+                                     yscrollcommand=tree_scroll.set)
         # self.tree = ttk.Treeview(self, columns=("Level", "Unlock", "Status", "Tags"), show="tree headings") ### For debugging with "Tags"
 
         self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
-        tree_scroll.config(command=self.tree.yview)
+        tree_scroll.config(command=self.on_tree_scroll)
 
 
-        self.tree.heading("#0", text=self.language.get("heading_duty", "Duty"), anchor=tk.W)
-        self.tree.heading("Level", text=self.language.get("heading_level", "Level"), anchor=tk.W)
-        self.tree.heading("Unlock", text=self.language.get("heading_unlock", "Unlock"), anchor=tk.W)
-        self.tree.heading("Status", text=self.language.get("heading_status", "Status"), anchor=tk.W)
+        self.tree.heading("#0", anchor=tk.W)
+        bind_heading(self.tree, "#0", self.language, "heading_duty", "Duty")
+        self.tree.heading("Level", anchor=tk.W)
+        bind_heading(self.tree, "Level", self.language, "heading_level", "Level")
+        self.tree.heading("Unlock", anchor=tk.W)
+        bind_heading(self.tree, "Unlock", self.language, "heading_unlock", "Unlock")
+        self.tree.heading("Status", anchor=tk.W)
+        bind_heading(self.tree, "Status", self.language, "heading_status", "Status")
         # self.tree.heading("Tags", text=self.language.get("heading_tags", "Tags"), anchor=tk.W)
 
         self.tree.column("#0", width=300, anchor=tk.W)
@@ -139,66 +193,105 @@ class DungeonTracker(tk.Tk):
 
         self.tree.bind("<Double-1>", self.on_double_click)
         self.tree.bind("<Button-3>", self.show_context_menu)
+        # Prefetch quest info images around the selected or hovered duty, and stop when the user scrolls on
+        self.tree.bind("<<TreeviewSelect>>", self.on_tree_select, add="+")
+        self.tree.bind("<Motion>", self.on_tree_motion, add="+")
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, lambda event: self.prefetcher.cancel(), add="+")
 
         # Define the context menu
         self.context_menu = tk.Menu(self, tearoff=0)
-        self.context_menu.add_command(label=self.language.get("unlock", "Unlock"), command=self.unlock_duty)
-        self.context_menu.add_command(label=self.language.get("info", "Info"), command=self.show_info)
+        self.context_menu.add_command(command=self.unlock_duty)
+        bind_menu_label(self.context_menu, self.language, "unlock", "Unlock")
+        self.context_menu.add_command(command=self.show_info)
+        bind_menu_label(self.context_menu, self.language, "info", "Info")
 
-        logging.info("UI widgets created.")
+        logger.info("UI widgets created.")
+
+    def use_virtual_tree(self):
+        """
+        Decide whether to use the virtual tree. The 'virtual_tree' preference wins when it is set,
+        otherwise the virtual tree is used for catalogs of VIRTUAL_TREE_THRESHOLD duties or more.
+        """
+        preference = self.preferences.get("virtual_tree")
+        if preference is not None:
+            return bool(preference)
+        return len(self.model.duty_ids) >= VIRTUAL_TREE_THRESHOLD
 
     def _on_mousewheel(self, event):
         self.tree
 
     def clear_filters(self):
-        logging.info("Clearing all filters.")
+        logger.info("Clearing all filters.")
         for category, items in self.filter_vars.items():
             for item, var in items.items():
                 var.set(False)
         self.update_tree()  # Refresh the treeview to show all items
 
     def create_menu(self):
-        logging.info("Creating menu bar.")
+        logger.info("Creating menu bar.")
         menubar = tk.Menu(self)
         self.config(menu=menubar)
 
         file_menu = tk.Menu(menubar, tearoff=0)
-        menubar.add_cascade(label=self.language.get("menu_file", "File"), menu=file_menu)
-        file_menu.add_command(label=self.language.get("menu_export_theme", "Export Theme"), command=self.export_theme)
-        file_menu.add_command(label=self.language.get("menu_import_theme", "Import Theme"), command=self.import_theme)
-        file_menu.add_command(label=self.language.get("menu_create_theme", "Create Theme"), command=self.open_theme_creator)
+        menubar.add_cascade(menu=file_menu)
+        bind_menu_label(menubar, self.language, "menu_file", "File")
+        file_menu.add_command(command=self.export_theme)
+        bind_menu_label(file_menu, self.language, "menu_export_theme", "Export Theme")
+        file_menu.add_command(command=self.import_theme)
+        bind_menu_label(file_menu, self.language, "menu_import_theme", "Import Theme")
+        file_menu.add_command(command=self.open_theme_creator)
+        bind_menu_label(file_menu, self.language, "menu_create_theme", "Create Theme")
+
+        profile_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(menu=profile_menu)
+        bind_menu_label(menubar, self.language, "menu_profiles", "Profiles")
+        profile_menu.add_command(command=self.create_profile)
+        bind_menu_label(profile_menu, self.language, "menu_new_profile", "New Profile")
+        profile_menu.add_command(command=self.open_profile_selector)
+        bind_menu_label(profile_menu, self.language, "menu_switch_profile", "Switch Profile")
 
         help_menu = tk.Menu(menubar, tearoff=0)
-        menubar.add_cascade(label=self.language.get("menu_help", "Help"), menu=help_menu)
-        help_menu.add_command(label=self.language.get("menu_change_language", "Change Language"), command=self.create_language_selection_window)
-        help_menu.add_command(label=self.language.get("menu_app_help", "Application Help"), command=self.open_help_window)
+        menubar.add_cascade(menu=help_menu)
+        bind_menu_label(menubar, self.language, "menu_help", "Help")
+        help_menu.add_command(command=self.create_language_selection_window)
+        bind_menu_label(help_menu, self.language, "menu_change_language", "Change Language")
+        help_menu.add_command(command=self.open_help_window)
+        bind_menu_label(help_menu, self.language, "menu_app_help", "Application Help")
 
-        logging.info("Menu bar created.")
+        logger.info("Menu bar created.")
 
     def on_filter_change(self):
-        logging.debug("Filter changed.")
+        logger.debug("Filter changed.")
         self.update_tree()
         self.save_preferences()
 
-    def refresh_ui(self):
-        logging.info("Refreshing UI.")
+    def on_close(self):
+        logger.info("Closing application.")
+        # Remember which expansions and duty types are open
+        self.save_preferences()
+        self.persistence.close()
+        self.prefetcher.cancel()
+        self.image_service.close()
         self.destroy()
-        data = load_dungeon_data(self.data_file)
-        app = DungeonTracker(data, self.data_file, self.image_folder, self.themes_file, self.language_file)
-        app.mainloop()
 
     def save_preferences(self):
-        logging.info("Saving user preferences.")
+        # Runs on every filter click
+        logger.debug("Saving user preferences.")
         preferences = {
             "current_theme": self.current_theme,
             "filters": {k: {item: var.get() for item, var in v.items()} for k, v in self.filter_vars.items()},
-            "language_file": self.language_file
+            "language_file": self.language_file,
+            "save_delay": self.persistence.delay,
+            "virtual_tree": self.preferences.get("virtual_tree"),
+            "open_nodes": sorted(self.open_nodes)
         }
-        save_preferences(preferences)
-        logging.debug(f"Preferences saved: {preferences}")
+        save_preferences(preferences, self.preferences_file)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Preferences saved: {preferences}")
 
     def load_filters(self):
-        logging.info("Loading filters.")
+        logger.info("Loading filters.")
         saved_filters = self.preferences.get('filters', {})
         for category, items in saved_filters.items():
             if isinstance(items, list):  # Check if 'items' is a list
@@ -210,203 +303,222 @@ class DungeonTracker(tk.Tk):
                     if category in self.filter_vars and item in self.filter_vars[category]:
                         self.filter_vars[category][item].set(value)
         self.update_tree()
-        logging.info("Filters loaded.")
+        logger.info("Filters loaded.")
 
     def toggle_filters(self):
-        logging.debug("Toggling filter panel.")
+        logger.debug("Toggling filter panel.")
         if self.filter_frame.winfo_ismapped():
             self.filter_frame.pack_forget()
         else:
             self.filter_frame.pack(fill=tk.X, padx=10, pady=5)
 
     def expand_all(self):
-        logging.info("Expanding all tree nodes.")
-        for item in self.tree.get_children():
-            self.tree.item(item, open=True)
-            for sub_item in self.tree.get_children(item):
-                self.tree.item(sub_item, open=True)
-        logging.info("All tree nodes expanded.")
+        logger.info("Expanding all tree nodes.")
+        self.cancel_expand_all()
+        # Parents come before their children in the layout, so every node is filled after its parent
+        pending = deque(iid for iid in self.layout if iid)
+        self.expand_next_batch(pending)
+
+    def expand_next_batch(self, pending):
+        """
+        Open and fill nodes until about EXPAND_BATCH_ROWS items were inserted, then let the event loop run
+        before continuing with the rest.
+        """
+        inserted = 0
+        while pending and inserted < EXPAND_BATCH_ROWS:
+            iid = pending.popleft()
+            if iid in self.layout:
+                self.set_node_open(iid, True)
+                inserted += self.fill_node(iid)
+        if pending:
+            self.expand_job = self.after(1, self.expand_next_batch, pending)
+        else:
+            self.expand_job = None
+            logger.info("All tree nodes expanded.")
+
+    def cancel_expand_all(self):
+        if self.expand_job is not None:
+            self.after_cancel(self.expand_job)
+            self.expand_job = None
 
     def collapse_all(self):
-        logging.info("Collapsing all tree nodes.")
-        for item in self.tree.get_children():
-            self.tree.item(item, open=False)
-            for sub_item in self.tree.get_children(item):
-                self.tree.item(sub_item, open=False)
-        logging.info("All tree nodes collapsed.")
+        logger.info("Collapsing all tree nodes.")
+        self.cancel_expand_all()
+        for iid in self.layout:
+            if iid:
+                self.set_node_open(iid, False)
+        logger.info("All tree nodes collapsed.")
+
+    def set_node_open(self, iid, is_open):
+        """
+        Record whether an expansion or duty type is open, and open or close its item if it exists.
+        """
+        if is_open:
+            self.open_nodes.add(iid)
+        else:
+            self.open_nodes.discard(iid)
+        if self.tree.exists(iid):
+            self.tree.item(iid, open=is_open)
 
-    def insert_duties(self):
-        logging.info("Inserting duties into the treeview.")
-        for expansion in self.data:
-            exp_id = self.tree.insert("", "end", text=expansion["expansion"], open=True, tags=("expansion",))
-            for duty_type in expansion["duties"]:
-                type_id = self.tree.insert(exp_id, "end", text=duty_type["type"], open=True)
-                for i, duty in enumerate(duty_type["duties"]):
-                    # Initial insert without applying even/odd row tags
-                    tags = duty.get("Tags", [])
-                    self.tree.insert(type_id, "end", text=duty["Name"],
-                                    values=(duty["Level"], duty["Unlock"], duty["Status"]),
-                                    tags=tags)
-        
-        # Apply even/odd tags after all items are inserted
-        apply_even_odd_tags(self.tree, self.data)
+    def on_tree_open(self, event):
+        iid = self.tree.focus()
+        if iid in self.layout:
+            self.open_nodes.add(iid)
+            self.fill_node(iid)
 
-        logging.info("Duties inserted and even/odd tags applied.")
+    def on_tree_close(self, event):
+        self.open_nodes.discard(self.tree.focus())
 
-    def toggle_unlock(self, item):
-        logging.debug(f"Toggling unlock status for item: {self.tree.item(item, 'text')}")
-
-        values = self.tree.item(item, "values")
-        current_status = values[2]
-
-        new_status = "Unlocked" if current_status == "Locked" else "Locked"
-
-        # Update the tags: add 'unlocked' and remove 'evenrow'/'oddrow' if unlocking
-        tags = list(self.tree.item(item, "tags"))
-        if new_status == "Unlocked":
-            if "evenrow" in tags:
-                tags.remove("evenrow")
-            if "oddrow" in tags:
-                tags.remove("oddrow")
-            if "unlocked" not in tags:
-                tags.append("unlocked")
-        else:
-            # When locking again, determine the correct even/odd tag
-            if "unlocked" in tags:
-                tags.remove("unlocked")
-            row_index = self.tree.index(item)
-            tag = "evenrow" if row_index % 2 == 0 else "oddrow"
-            tags = [tag]
+    def fill_node(self, iid):
+        """
+        Insert the children of an expansion or duty type in place of its placeholder, the first time it is opened.
+        :return: The number of items now attached under the nodes that changed.
+        """
+        layout = self.materialized_layout([iid])
+        changed = self.reconciler.reconcile(layout, self.create_tree_item)
+        self.stripe_changed(changed)
+        return sum(len(layout[parent]) for parent in changed)
 
-        # Apply the updated tags to the Treeview item
-        self.tree.item(item, tags=tags)
+    def stripe_changed(self, parents):
+        """
+        Restripe the duty types whose rows were just attached, detached or moved; every other row keeps its tags.
+        """
+        for parent in parents:
+            if parent.count(":") == 1:
+                stripe_rows(self.tree, parent)
 
-        # Update the status in the Treeview values
-        self.tree.item(item, values=(values[0], values[1], new_status))
+    def materialized_layout(self, roots):
+        """
+        Restrict the visible layout to the nodes whose children should exist in the Treeview.
+        Children are only inserted under nodes that are open or were filled before; any other node
+        gets a single placeholder child, so it still shows an open indicator.
+        :param roots: The parent ids to start from ("" for the whole tree).
+        :return: A layout suitable for TreeReconciler.reconcile.
+        """
+        result = {}
+        pending = deque(roots)
+        while pending:
+            parent = pending.popleft()
+            children = self.layout.get(parent)
+            if children is None:
+                continue
+            if parent == "" or parent in self.open_nodes or parent in self.filled:
+                self.filled.add(parent)
+                result[parent] = children
+                # Duties have no children, only descend into expansions and duty types
+                if parent.count(":") < 1:
+                    pending.extend(children)
+            else:
+                result[parent] = [f"{parent}{PLACEHOLDER_SUFFIX}"]
+        return result
 
-        # Update the JSON data with the new status and tags
-        self.update_json_data(item, new_status, tags)
+    def insert_duties(self):
+        logger.info("Inserting duties into the treeview.")
+        self.reconciler = TreeReconciler(self.tree)
+        self.filled = set()
+        self.expand_job = None
+        # Expansions and duty types are all open the first time, afterwards the last open state is restored
+        open_nodes = self.preferences.get("open_nodes")
+        if open_nodes is None:
+            open_nodes = {iid for parents in self.model.duty_parents for iid in parents}
+        self.open_nodes = set(open_nodes)
+
+        self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)
+        self.tree.bind("<<TreeviewClose>>", self.on_tree_close)
+
+        # Children of collapsed nodes are only inserted when the node is first opened
+        self.update_tree()
 
-        # Save the updated JSON data to the file
-        save_dungeon_data(self.data_file, self.data)
+        logger.info("Duties inserted and even/odd tags applied.")
 
-        logging.info(f"Item {self.tree.item(item, 'text')} status toggled to {new_status}.")
+    def create_tree_item(self, iid):
+        """
+        Build the Treeview insert options for an item id the first time it becomes visible.
+        Item ids are "<expansion>", "<expansion>:<type>" and "<expansion>:<type>:<duty>" indices into self.data,
+        plus the placeholder children of nodes that were not filled yet.
+        """
+        if iid.endswith(PLACEHOLDER_SUFFIX):
+            return {"text": ""}
+        indices = [int(part) for part in iid.split(":")]
+        expansion = self.data[indices[0]]
+        if len(indices) == 1:
+            return {"text": expansion["expansion"], "open": iid in self.open_nodes, "tags": ("expansion",)}
+        duty_type = expansion["duties"][indices[1]]
+        if len(indices) == 2:
+            return {"text": duty_type["type"], "open": iid in self.open_nodes}
+        duty = duty_type["duties"][indices[2]]
+        # Row striping is applied once the item is in place
+        tags = ("unlocked",) if duty["Status"] == "Unlocked" else ()
+        return {"text": duty["Name"], "values": (duty["Level"], duty["Unlock"], duty["Status"]), "tags": tags}
 
-    def update_json_data(self, item, new_status, new_tags):
+    def toggle_unlock(self, item):
+        logger.debug(f"Toggling unlock status for item: {item}")
+        # The model saves the change in the background and emits "status", which updates the row
+        new_status = self.model.toggle_status(item)
+        logger.info(f"Item {self.model.duty(item)['Name']} status toggled to {new_status}.")
+
+    def render_status(self, duty_ids):
         """
-        Update the JSON data for the specific item to reflect the new status and tags.
+        Show the new status of duties whose rows were already created. Detached rows keep their values,
+        so every created row is updated, not only the visible ones.
         """
-        for expansion in self.data:
-            for duty_type in expansion["duties"]:
-                for duty in duty_type["duties"]:
-                    if duty["Name"] == self.tree.item(item, "text"):
-                        duty["Status"] = new_status
-                        duty["Tags"] = new_tags
-                        logging.debug(f"Updated JSON for {duty['Name']}: Status={new_status}, Tags={new_tags}")
-                        return
+        parents = set()
+        for duty_id in duty_ids:
+            if self.tree.exists(duty_id):
+                values = self.tree.item(duty_id, "values")
+                self.tree.item(duty_id, values=(values[0], values[1], self.model.status(duty_id)))
+                parents.add(self.tree.parent(duty_id))
+        # Restripe the changed duty types, unlocked rows do not count towards the striping
+        for parent in parents:
+            if parent:
+                stripe_rows(self.tree, parent)
 
     def reset_status(self):
-        logging.info("Resetting status of all duties to 'Locked'.")
-        for expansion in self.data:
-            for duty_type in expansion['duties']:
-                for duty in duty_type['duties']:
-                    duty["Status"] = "Locked"
-                    duty["Tags"] = []
-
-        for item in self.tree.get_children():
-            self.tree.item(item, open=True)
-            for sub_item in self.tree.get_children(item):
-                self.tree.item(sub_item, open=True)
-                for duty_item in self.tree.get_children(sub_item):
-                    self.tree.item(duty_item, values=(self.tree.item(duty_item, "values")[0],
-                                                    self.tree.item(duty_item, "values")[1],
-                                                    "Locked"))
-                    row_index = self.tree.index(duty_item)
-                    tag = "evenrow" if row_index % 2 == 0 else "oddrow"
-                    self.tree.item(duty_item, tags=[tag])
-                    # Update the JSON data to reflect the status and tags
-                    self.update_json_data(duty_item, "Locked", [tag])
-
-        save_dungeon_data(self.data_file, self.data)
-        self.update_tree()
-        logging.info("Status of all duties reset to 'Locked'.")
+        self.model.reset_status()
+        logger.info("Status of all duties reset to 'Locked'.")
 
-    def update_tree(self, *args):
-        logging.info("Updating the treeview with current filters and search query.")
-        search_query = self.search_var.get().lower()
-
-        selected_filters = {
+    def selected_filters(self):
+        return {
             category: {item for item, var in items.items() if var.get()}
             for category, items in self.filter_vars.items()
         }
 
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def update_tree(self, *args):
+        logger.debug("Updating the treeview with current filters and search query.")
+        self.model.set_view(self.selected_filters(), self.search_var.get())
 
-        for expansion in self.data:
-            if selected_filters["Expansion"] and expansion["expansion"] not in selected_filters["Expansion"]:
-                continue
-            exp_id = self.tree.insert("", "end", text=expansion["expansion"], open=True, tags=("expansion",))
-            for duty_type in expansion["duties"]:
-                if selected_filters["Duty Type"] and duty_type["type"] not in selected_filters["Duty Type"]:
-                    continue
-                type_id = self.tree.insert(exp_id, "end", text=duty_type["type"], open=True)
-                for i, duty in enumerate(duty_type["duties"]):
-                    if selected_filters["Quest Type"] and duty["Quest Type"] not in selected_filters["Quest Type"]:
-                        continue
-                    if selected_filters["Status"] and duty["Status"] not in selected_filters["Status"]:
-                        continue
-                    level_range = self.get_level_range(duty["Level"])
-                    if selected_filters["Level"] and level_range not in selected_filters["Level"]:
-                        continue
-                    duty_name = duty["Name"].lower()
-                    if self.match_query(duty_name, search_query):
-                        tags = duty.get("Tags", [])
-                        item = self.tree.insert(type_id, "end", text=duty["Name"],
-                                                values=(duty["Level"], duty["Unlock"], duty["Status"], ", ".join(tags)),
-                                                tags=tags)
-                if not self.tree.get_children(type_id):
-                    self.tree.delete(type_id)
-            if not self.tree.get_children(exp_id):
-                self.tree.delete(exp_id)
-        logging.info("Treeview update complete.")
-        apply_even_odd_tags(self.tree, self.data)
-        update_locked_state(self.tree)
-
-    def get_level_range(self, level):
-        level = int(level)
-        ranges = ["10-15", "15-20", "20-25", "25-30", "35-40", "45-50", "50-55", "55-60", "65-70", "75-80", "85-90", "90-95", "95-100"]
-        for r in ranges:
-            start, end = map(int, r.split('-'))
-            if start <= level <= end:
-                return r
-        return ""
-
-    def match_query(self, text, query):
-        if query == "":
-            return True
-        if "*" in query:
-            pattern = re.compile(query.replace("*", ".*"))
-            return pattern.search(text) is not None
-        if '"' in query:
-            parts = query.split('"')
-            return any(part in text for part in parts if part)
-        return query in text
+    def render_layout(self, layout):
+        """
+        Bring the Treeview in line with the visible layout of the model, applying only the difference.
+        """
+        self.layout = layout
+        # Open every expansion and duty type that contains a search match
+        if self.model.query:
+            for iid in layout:
+                if iid and iid not in self.open_nodes:
+                    self.set_node_open(iid, True)
+
+        changed = self.reconciler.reconcile(self.materialized_layout([""]), self.create_tree_item)
+        # Only the duty types whose rows changed are restriped, so the cost follows the size of the change
+        self.stripe_changed(changed)
+        logger.debug("Treeview update complete.")
 
     def show_context_menu(self, event):
         item = self.tree.identify_row(event.y)
         if item:
             self.tree.selection_set(item)
             self.context_menu.post(event.x_root, event.y_root)
-        logging.debug(f"Context menu shown for item: {self.tree.item(item, 'text')}")
+        logger.debug(f"Context menu shown for item: {self.tree.item(item, 'text')}")
 
     def unlock_duty(self):
         item = self.tree.selection()[0]
-        logging.debug(f"Unlocking duty for item: {self.tree.item(item, 'text')}")
+        if item not in self.model.registry:
+            return
+        logger.debug(f"Unlocking duty for item: {item}")
         self.toggle_unlock(item)
 
     def create_language_selection_window(self):
-        logging.info("Creating language selection window.")
+        logger.info("Creating language selection window.")
         language_selector = tk.Toplevel(self)
         language_selector.title("Select Language")
 
@@ -427,10 +539,10 @@ class DungeonTracker(tk.Tk):
             button.configure(bg=self.themes[self.current_theme].get("button_bg", "#f0f0f0"),
                             fg=self.themes[self.current_theme].get("fg", "#000000"))
 
-        logging.info("Language selection window created.")
+        logger.info("Language selection window created.")
     
     def open_help_window(self):
-        logging.info("Opening help window.")
+        logger.info("Opening help window.")
         help_window = tk.Toplevel(self)
         help_window.title(self.language.get("help_window_title", "Application Help"))
 
@@ -473,38 +585,29 @@ class DungeonTracker(tk.Tk):
         close_button.configure(bg=self.themes[self.current_theme].get("button_bg", "#f0f0f0"),
                             fg=self.themes[self.current_theme].get("fg", "#000000"))
 
-        logging.info("Help window opened.")
+        logger.info("Help window opened.")
 
     def show_info(self):
         item = self.tree.selection()[0]
-        duty_name = self.tree.item(item, "text")
-        logging.info(f"Showing info for duty: {duty_name}")
+        if item not in self.model.registry:
+            return
+        duty_name = self.model.duty(item)["Name"]
+        logger.info(f"Showing info for duty: {duty_name}")
 
         # Fetch the image corresponding to the selected duty
-        unlock_text = self.tree.item(item, "values")[1]
-        image_name = "".join(c for c in unlock_text if c.isalnum()).lower() + ".jpg"
-        
-        # Construct the path based on folder structure and expansion
-        parent_type_id = self.tree.parent(item)
-        parent_expansion_id = self.tree.parent(parent_type_id)
-        expansion = self.tree.item(parent_expansion_id, "text")
-        duty_type = self.tree.item(parent_type_id, "text")
-
-        image_path = os.path.join(self.image_folder, expansion, duty_type, image_name)
+        expansion, duty_type = self.model.location(item)
+        image_path = self.duty_image_path(item)
 
-        if not os.path.exists(image_path):
+        if image_path is None:
             messagebox.showinfo(self.language.get("info", "Info"), self.language.get("no_image_found", "No image found for this duty."))
-            logging.warning(f"No image found for duty: {duty_name} at {image_path}")
+            logger.warning(f"No image found for duty: {duty_name} in {expansion}/{duty_type}")
             return
 
         info_window = tk.Toplevel(self)
         info_window.title(duty_name)
 
-        # Create widgets first
-        img = Image.open(image_path)
-        photo = ImageTk.PhotoImage(img)
-        img_label = tk.Label(info_window, image=photo)
-        img_label.image = photo  # Keep a reference to avoid garbage collection
+        # Create widgets first, the image is decoded in the background unless it is cached
+        img_label = tk.Label(info_window, text=self.language.get("loading", "Loading..."))
         img_label.pack()
 
         close_button = tk.Button(info_window, text=self.language.get("close", "Close"), command=info_window.destroy)
@@ -517,10 +620,108 @@ class DungeonTracker(tk.Tk):
         close_button.configure(bg=self.themes[self.current_theme].get("button_bg", "#f0f0f0"),
                             fg=self.themes[self.current_theme].get("fg", "#000000"))
 
-        logging.info(f"Info window opened for duty: {duty_name}")
+        def show_image(photo):
+            if not img_label.winfo_exists():
+                return
+            if photo is None:
+                img_label.configure(text=self.language.get("no_image_found", "No image found for this duty."))
+                return
+            img_label.configure(image=photo, text="")
+            img_label.image = photo  # Keep a reference to avoid garbage collection
+
+        self.image_service.request(image_path, show_image, self.info_image_size())
+
+        logger.info(f"Info window opened for duty: {duty_name}")
+
+    def duty_image_path(self, duty_id):
+        """
+        Return the quest info image path of a duty, or None if it has no image.
+        """
+        expansion, duty_type = self.model.location(duty_id)
+        return get_image_path(self.image_folder, expansion, duty_type, self.model.duty(duty_id)["Unlock"])
+
+    def prefetch_around(self, duty_id):
+        """
+        Decode the info images of a duty and its neighbors in the filtered view ahead of time,
+        nearest first, replacing any prefetch still in progress.
+        """
+        index = self.model.visible_index.get(duty_id)
+        if index is None:
+            return
+        duty_ids = [duty_id]
+        for distance in range(1, PREFETCH_NEIGHBORS + 1):
+            for neighbor in (index + distance, index - distance):
+                if 0 <= neighbor < len(self.model.visible_duties):
+                    duty_ids.append(self.model.visible_duties[neighbor])
+        paths = [path for path in map(self.duty_image_path, duty_ids) if path]
+        self.prefetcher.start(paths, self.info_image_size())
+
+    def on_tree_select(self, event):
+        # The selection is read once the event is handled, the virtual tree updates it after application bindings
+        self.after_idle(self.prefetch_selection)
+
+    def prefetch_selection(self):
+        selection = self.tree.selection()
+        if selection and selection[0] in self.model.registry:
+            self.prefetch_around(selection[0])
+
+    def on_tree_motion(self, event):
+        item = self.tree.identify_row(event.y)
+        if item != self.hover_row:
+            self.hover_row = item
+            if item in self.model.registry:
+                self.prefetch_around(item)
+
+    def on_tree_scroll(self, *args):
+        self.prefetcher.cancel()
+        self.tree.yview(*args)
+
+    def info_image_size(self):
+        """
+        The size quest info images are scaled to fit in, so that the info window fits on the screen.
+        Quest info images are smaller than this on common screens, so they are shown from the originals.
+        """
+        return (int(self.winfo_screenwidth() * INFO_IMAGE_SCALE), int(self.winfo_screenheight() * INFO_IMAGE_SCALE))
+
+    def create_profile(self):
+        name = simpledialog.askstring(self.language.get("menu_new_profile", "New Profile"),
+                                      self.language.get("profile_name", "Profile Name"), parent=self)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        if self.profiles.create(name):
+            self.switch_profile(name)
+
+    def open_profile_selector(self):
+        logger.info("Opening profile selector.")
+        profile_selector = tk.Toplevel(self)
+        profile_selector.title(self.language.get("select_profile", "Select Profile"))
+
+        # Create widgets first
+        buttons = []
+        for profile_name in self.profiles.names():
+            button = tk.Button(profile_selector, text=profile_name, command=lambda pn=profile_name: self.switch_profile(pn))
+            button.pack(fill=tk.X, padx=10, pady=5)
+            buttons.append(button)
+
+        # Apply the current theme to the new window after all widgets are created
+        apply_theme_to_new_window(profile_selector, self.themes.get(self.current_theme, self.default_theme()))
+
+        # Explicitly update all buttons with the theme
+        for button in buttons:
+            button.configure(bg=self.themes[self.current_theme].get("button_bg", "#f0f0f0"),
+                            fg=self.themes[self.current_theme].get("fg", "#000000"))
+
+        logger.info("Profile selector opened.")
+
+    def switch_profile(self, profile_name):
+        logger.info(f"Switching to profile: {profile_name}")
+        # Only the rows whose status differs between the two profiles are updated, through the "status" event
+        self.profiles.switch(profile_name)
+        self.update_title()
 
     def open_theme_selector(self):
-        logging.info("Opening theme selector.")
+        logger.info("Opening theme selector.")
         theme_selector = tk.Toplevel(self)
         theme_selector.title(self.language.get("select_theme", "Select Theme"))
 
@@ -539,17 +740,17 @@ class DungeonTracker(tk.Tk):
             button.configure(bg=self.themes[self.current_theme].get("button_bg", "#f0f0f0"),
                             fg=self.themes[self.current_theme].get("fg", "#000000"))
 
-        logging.info("Theme selector opened.")
+        logger.info("Theme selector opened.")
 
     def change_theme(self, theme_name):
-        logging.info(f"Changing theme to: {theme_name}")
+        logger.info(f"Changing theme to: {theme_name}")
         self.current_theme = theme_name
         apply_theme(self, self.themes.get(theme_name, self.default_theme()))
         self.save_preferences()
-        logging.info(f"Theme changed to: {theme_name}")
+        logger.info(f"Theme changed to: {theme_name}")
 
     def open_theme_creator(self):
-        logging.info("Opening theme creator.")
+        logger.info("Opening theme creator.")
         theme_creator = tk.Toplevel(self)
         theme_creator.title(self.language.get("create_theme", "Create Theme"))
 
@@ -564,13 +765,19 @@ class DungeonTracker(tk.Tk):
         color_buttons = {}
 
         def pick_color(attribute):
-            color = tk.colorchooser.askcolor()[1]  # This opens the color chooser
+            color = colorchooser.askcolor(theme.get(attribute))[1]  # This opens the color chooser
             if color:
                 color_buttons[attribute].configure(bg=color)
                 theme[attribute] = color
-                apply_theme(self, theme)  # Apply preview to the main window
+                apply_theme(self, theme)  # Apply preview to the main window, only the changed color is reapplied
+
+        def close_creator():
+            # Undo the preview, unless the new theme was saved and applied
+            apply_theme(self, self.themes.get(self.current_theme, self.default_theme()))
+            theme_creator.destroy()
 
-        theme = {}  # Temporary theme dictionary to hold changes
+        # Temporary theme dictionary to hold changes, starting from the current theme
+        theme = dict(self.themes.get(self.current_theme, self.default_theme()))
         for attribute in color_attributes:
             attr_label = tk.Label(theme_creator, text=self.language.get(attribute, attribute))
             attr_label.pack(padx=10, pady=5)
@@ -585,20 +792,33 @@ class DungeonTracker(tk.Tk):
         save_button.pack(padx=10, pady=10)
 
         cancel_button = tk.Button(theme_creator, text=self.language.get("cancel", "Cancel"),
-                                command=theme_creator.destroy)
+                                command=close_creator)
         cancel_button.pack(padx=10, pady=5)
+        theme_creator.protocol("WM_DELETE_WINDOW", close_creator)
 
         # Apply the theme to the new window after all widgets are created
         apply_theme_to_new_window(theme_creator, self.themes.get(self.current_theme, self.default_theme()))
 
-        logging.info("Theme creator opened.")
+        logger.info("Theme creator opened.")
+
+    def save_new_theme(self, theme_name, theme, theme_creator):
+        theme_name = theme_name.strip()
+        if not theme_name:
+            messagebox.showerror(self.language.get("error", "Error"), self.language.get("theme_name_required", "Please enter a theme name."), parent=theme_creator)
+            return
+        logger.info(f"Saving new theme: {theme_name}")
+        self.themes[theme_name] = dict(theme)
+        save_themes(self.themes_file, self.themes)
+        theme_creator.destroy()
+        # The preview is already applied, so switching to the new theme only records it
+        self.change_theme(theme_name)
 
     def export_theme(self):
-        logging.info("Exporting current theme.")
+        logger.info("Exporting current theme.")
         theme_name = self.current_theme
         if theme_name not in self.themes:
             messagebox.showerror(self.language.get("error", "Error"), self.language.get("theme_not_found", "Theme not found."))
-            logging.error(f"Theme not found for export: {theme_name}")
+            logger.error(f"Theme not found for export: {theme_name}")
             return
 
         file_path = filedialog.asksaveasfilename(defaultextension=".json",
@@ -608,10 +828,10 @@ class DungeonTracker(tk.Tk):
             theme_data = self.themes[theme_name]
             save_themes(file_path, {theme_name: theme_data})
             messagebox.showinfo(self.language.get("success", "Success"), self.language.get("theme_exported", "Theme exported successfully."))
-            logging.info(f"Theme exported: {theme_name} to {file_path}")
+            logger.info(f"Theme exported: {theme_name} to {file_path}")
 
     def import_theme(self):
-        logging.info("Importing theme.")
+        logger.info("Importing theme.")
         file_path = filedialog.askopenfilename(defaultextension=".json",
                                                filetypes=[("JSON Files", "*.json")],
                                                title=self.language.get("import_theme", "Import Theme"))
@@ -621,22 +841,26 @@ class DungeonTracker(tk.Tk):
                 self.themes.update(imported_themes)
                 self.save_preferences()
                 messagebox.showinfo(self.language.get("success", "Success"), self.language.get("theme_imported", "Theme imported successfully."))
-                logging.info(f"Themes imported from: {file_path}")
+                logger.info(f"Themes imported from: {file_path}")
             else:
                 messagebox.showerror(self.language.get("error", "Error"), self.language.get("import_failed", "Failed to import theme."))
-                logging.error("Failed to import themes from the file.")
+                logger.error("Failed to import themes from the file.")
 
     def toggle_item(self, item):
-        logging.debug(f"Toggling item: {item}")
+        logger.debug(f"Toggling item: {item}")
         self.tree.item(item, open=not self.tree.item(item, "open"))
 
     def on_double_click(self, event):
-        item = self.tree.selection()[0]
-        logging.info(f"Double-clicked on item: {self.tree.item(item, 'text')}")
+        selection = self.tree.selection()
+        # Only duties can be unlocked, double-clicking an expansion or duty type just opens or closes it
+        if not selection or selection[0] not in self.model.registry:
+            return
+        item = selection[0]
+        logger.info(f"Double-clicked on item: {self.model.duty(item)['Name']}")
         self.toggle_unlock(item)
 
     def default_theme(self):
-        logging.debug("Loading default theme.")
+        logger.debug("Loading default theme.")
         return {
             "bg": "#f0f0f0",
             "fg": "#000000",
@@ -652,11 +876,16 @@ class DungeonTracker(tk.Tk):
         }
 
 if __name__ == "__main__":
+    configure_logging()
     data_file = "duties.json"
     themes_file = "themes.json"
     language_file = "en.json"
     image_folder = "QuestInfo"
 
+    # Use the SQLite backend once the data has been migrated with sqlite_store.py
+    if os.path.exists("duties.db"):
+        data_file = themes_file = "duties.db"
+
     data = load_dungeon_data(data_file)
     app = DungeonTracker(data, data_file, image_folder, themes_file, language_file)
     app.mainloop()
@@ -0,0 +1,214 @@
+import io
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+PACK_EXTENSION = '.dspk'
+PACK_MAGIC = b'DSPK'
+PACK_VERSION = 1
+# Magic, version and the length of the JSON index that follows the header
+_HEADER = struct.Struct('<4sHI')
+
+# Packs already opened, by image folder
+_packs = {}
+
+def pack_path(image_folder):
+    """
+    Return where the packed archive of an image folder is stored: next to it, as "<folder>.dspk".
+    """
+    return os.path.normpath(image_folder) + PACK_EXTENSION
+
+class _BlobReader(io.RawIOBase):
+    """
+    A read-only file object over a slice of the mapped pack, so decoders can read an image
+    without it being copied out of the mapping first.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self.view) - self.position)
+        if count <= 0:
+            return 0
+        buffer[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        # Release the slice so the mapping can be closed
+        self.view.release()
+        super().close()
+
+class AssetPack:
+    """
+    A single-file archive of the images of an image folder.
+
+    The file starts with a small header (magic, version, index length) followed by a JSON index
+    mapping each relative path to the offset and length of its blob, and then the blobs stored
+    back to back. The file is memory-mapped, so opening an image is a dictionary lookup and a slice.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The path of the pack file.
+        """
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_length = _HEADER.unpack_from(self.map, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {PACK_VERSION} asset pack")
+        index_start = _HEADER.size
+        self.index = json.loads(self.map[index_start:index_start + index_length].decode('utf-8'))
+        self.data_start = index_start + index_length
+        self.mtime_ns = os.fstat(self.file.fileno()).st_mtime_ns
+
+    def __contains__(self, relative_path):
+        return self.key(relative_path) in self.index
+
+    @staticmethod
+    def key(relative_path):
+        # Index keys always use forward slashes, whatever the platform the pack was built on
+        return relative_path.replace(os.sep, '/')
+
+    def names(self):
+        return list(self.index)
+
+    def size(self, relative_path):
+        return self.index[self.key(relative_path)][1]
+
+    def view(self, relative_path):
+        """
+        Return a memoryview of an image's bytes inside the mapping, without copying them.
+        """
+        offset, length = self.index[self.key(relative_path)]
+        start = self.data_start + offset
+        return memoryview(self.map)[start:start + length]
+
+    def open(self, relative_path):
+        """
+        Open an image stored in the pack as a read-only binary file object.
+        """
+        return io.BufferedReader(_BlobReader(self.view(relative_path)))
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+def build_pack(image_folder, output_path=None):
+    """
+    Pack every file under an image folder into a single archive.
+    :param image_folder: Root folder of the images.
+    :param output_path: The path of the pack to write, by default "<folder>.dspk".
+    :return: The number of files packed.
+    """
+    output_path = output_path or pack_path(image_folder)
+    files = []
+    for directory, _, file_names in os.walk(image_folder):
+        for file_name in sorted(file_names):
+            path = os.path.join(directory, file_name)
+            files.append((AssetPack.key(os.path.relpath(path, image_folder)), path))
+    files.sort()
+
+    index = {}
+    offset = 0
+    for key, path in files:
+        length = os.path.getsize(path)
+        index[key] = [offset, length]
+        offset += length
+    index_bytes = json.dumps(index, ensure_ascii=False).encode('utf-8')
+
+    temp_path = output_path + ".tmp"
+    with open(temp_path, 'wb') as output:
+        output.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(index_bytes)))
+        output.write(index_bytes)
+        for key, path in files:
+            with open(path, 'rb') as source:
+                output.write(source.read())
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temp_path, output_path)
+    logger.info(f"Packed {len(files)} files from {image_folder} into {output_path}.")
+    return len(files)
+
+def find_pack(image_folder):
+    """
+    Return the opened pack of an image folder, or None if it has no pack.
+    Only opened packs are cached, so a pack built while the app runs is picked up by the next call.
+    """
+    if image_folder in _packs:
+        return _packs[image_folder]
+    path = pack_path(image_folder)
+    if not os.path.exists(path):
+        return None
+    try:
+        pack = AssetPack(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to open asset pack {path}: {e}")
+        return None
+    logger.info(f"Using asset pack {path} with {len(pack.index)} files.")
+    _packs[image_folder] = pack
+    return pack
+
+def _locate(path):
+    """
+    Find the pack holding a path of the form "<image folder>/<relative path>".
+    :return: A (pack, relative path) tuple, or (None, None).
+    """
+    for image_folder, pack in _packs.items():
+        relative = os.path.relpath(path, image_folder)
+        if not relative.startswith(os.pardir) and relative in pack:
+            return pack, relative
+    return None, None
+
+def open_asset(path):
+    """
+    Open an image for reading, from its pack if its image folder has one, else from disk.
+    """
+    pack, relative = _locate(path)
+    if pack is not None:
+        return pack.open(relative)
+    return open(path, 'rb')
+
+def asset_mtime_ns(path):
+    """
+    Return the modification time of an image; packed images share the time of their pack.
+    """
+    pack, relative = _locate(path)
+    if pack is not None:
+        return pack.mtime_ns
+    return os.stat(path).st_mtime_ns
+
+if __name__ == "__main__":
+    configure_logging()
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python asset_pack.py <image folder> [output.dspk]")
+        sys.exit(1)
+    count = build_pack(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None)
+    print(f"Packed {count} files into {sys.argv[2] if len(sys.argv) == 3 else pack_path(sys.argv[1])}.")
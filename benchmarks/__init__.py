@@ -0,0 +1,10 @@
+"""
+Benchmarks for the tracker core.
+
+generate.py writes synthetic duties.json catalogs of any size in the same expansion/type/duty
+layout as the real one, and run.py times the core operations on them, headlessly or in a real
+Tk window. Run them from the repository root:
+
+    python -m benchmarks.generate 10000 duties_10k.json
+    python -m benchmarks.run --sizes 1000 10000 100000 --output results.jsonl
+"""
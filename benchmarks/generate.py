@@ -0,0 +1,64 @@
+import json
+import random
+import sys
+from filter_engine import LEVEL_RANGES
+
+EXPANSIONS = ["A Realm Reborn", "Heavensward", "Stormblood", "Shadowbringers", "Endwalker", "Dawntrail"]
+DUTY_TYPES = ["Dungeons", "Trials", "Raids", "Guildhests"]
+QUEST_TYPES = ["Main Quest", "Feature Quest"]
+WORDS = ["Crystal", "Tower", "Vault", "Labyrinth", "Aetherial", "Keeper", "Dragon", "Sunken", "Temple", "Ruins",
+         "Garden", "Fortress", "Abyss", "Palace", "Storm", "Ancient", "Echo", "Bloom", "Frost", "Ember"]
+# Share of duties that start unlocked
+UNLOCKED_SHARE = 0.3
+
+def generate_catalog(size, seed=0):
+    """
+    Build a synthetic catalog in the duties.json layout.
+    Duties are spread evenly over the expansions (more are added past the real six) and duty types.
+    :param size: The number of duties.
+    :param seed: Seed of the random generator, so the same size always gives the same catalog.
+    :return: The dungeon data, as load_dungeon_data would return it.
+    """
+    rng = random.Random(seed)
+    expansion_count = max(len(EXPANSIONS), size // 2000)
+    expansion_names = EXPANSIONS + [f"Expansion {index + 1}" for index in range(len(EXPANSIONS), expansion_count)]
+    groups = [(expansion, duty_type) for expansion in expansion_names for duty_type in DUTY_TYPES]
+
+    data = []
+    expansions = {}
+    for index in range(size):
+        expansion_name, type_name = groups[index * len(groups) // size]
+        if expansion_name not in expansions:
+            expansions[expansion_name] = {"expansion": expansion_name, "duties": []}
+            data.append(expansions[expansion_name])
+        duty_types = expansions[expansion_name]["duties"]
+        if not duty_types or duty_types[-1]["type"] != type_name:
+            duty_types.append({"type": type_name, "duties": []})
+        start, end = map(int, rng.choice(LEVEL_RANGES).split("-"))
+        name = " ".join(rng.sample(WORDS, 2))
+        duty_types[-1]["duties"].append({
+            "Name": f"The {name} {index}",
+            "Level": rng.randint(start, end),
+            "Unlock": f"{rng.choice(WORDS)} of the {name} {index}",
+            "Quest Type": rng.choice(QUEST_TYPES),
+            "Status": "Unlocked" if rng.random() < UNLOCKED_SHARE else "Locked",
+            "Tags": [],
+        })
+    return data
+
+def write_catalog(file_path, size, seed=0):
+    """
+    Write a synthetic catalog to a JSON file.
+    :return: The generated data.
+    """
+    data = generate_catalog(size, seed)
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=4)
+    return data
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python -m benchmarks.generate <duties> <output.json> [seed]")
+        sys.exit(1)
+    write_catalog(sys.argv[2], int(sys.argv[1]), int(sys.argv[3]) if len(sys.argv) == 4 else 0)
+    print(f"Wrote {sys.argv[1]} duties to {sys.argv[2]}.")
@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.generate import write_catalog
+from data_handler import load_dungeon_data, save_dungeon_data
+from search_index import match_text
+from theme_manager import apply_even_odd_tags, stripe_rows
+from tracker_model import TrackerModel
+from tree_reconciler import TreeReconciler
+from tests.memory_treeview import MemoryTreeview
+from log_config import configure_logging
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 5
+QUERIES = ["crystal", "tower 12", "dra*on", '"vault" "abyss"', "x"]
+FILTERS = {"Expansion": {"Heavensward", "Stormblood"}, "Status": {"Locked"}}
+
+def timed(function, repeat):
+    """
+    Run a function repeat times and return the duration of each run in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+def result(mode, size, operation, durations):
+    return {
+        "mode": mode,
+        "size": size,
+        "operation": operation,
+        "runs": len(durations),
+        "best": min(durations),
+        "median": statistics.median(durations),
+        "mean": statistics.fmean(durations),
+    }
+
+def create_item(registry):
+    def create(iid):
+        duty = registry.get(iid) if iid in registry else None
+        if duty is None:
+            return {"text": iid, "open": True}
+        return {"text": duty["Name"], "values": (duty["Level"], duty["Unlock"], duty["Status"])}
+    return create
+
+def run_headless(data_file, size, repeat):
+    """
+    Time the core operations on a TrackerModel, without Tk.
+    :return: A list of result dictionaries.
+    """
+    results = []
+    data = load_dungeon_data(data_file)
+    results.append(result("headless", size, "build_indexes", timed(lambda: TrackerModel(data), 1)))
+    model = TrackerModel(data)
+
+    texts = model.search_index.texts
+    results.append(result("headless", size, "match_query_scan", timed(
+        lambda: [sum(1 for text in texts if match_text(text, query)) for query in QUERIES], repeat)))
+    results.append(result("headless", size, "match_query_index", timed(
+        lambda: [model.search_index.search(query) for query in QUERIES], repeat)))
+
+    # Render the model into an in-memory tree, the way DungeonTracker renders it into the Treeview
+    tree = MemoryTreeview()
+    reconciler = TreeReconciler(tree)
+    create = create_item(model.registry)
+
+    def render_layout(layout):
+        for parent in reconciler.reconcile(layout, create):
+            if parent.count(":") == 1:
+                stripe_rows(tree, parent)
+    model.subscribe("layout", render_layout)
+    model.refresh()
+    states = [(FILTERS, ""), ({}, ""), ({}, "crystal"), ({}, "")]
+
+    def update_tree():
+        for selected_filters, query in states:
+            model.set_view(selected_filters, query)
+    results.append(result("headless", size, "update_tree", [duration / len(states) for duration in timed(update_tree, repeat)]))
+    results.append(result("headless", size, "apply_even_odd_tags", timed(lambda: apply_even_odd_tags(tree), repeat)))
+    results.append(result("headless", size, "reset_status", timed(model.reset_status, repeat)))
+    results.append(result("headless", size, "save_dungeon_data", timed(lambda: save_dungeon_data(data_file, data), repeat)))
+    return results
+
+def start_xvfb():
+    """
+    Start a virtual X server if there is no display.
+    :return: The Xvfb process, or None if a display is already available.
+    """
+    if os.environ.get("DISPLAY"):
+        return None
+    if shutil.which("Xvfb") is None:
+        raise RuntimeError("No display and Xvfb is not installed")
+    display = ":99"
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    time.sleep(1)
+    return process
+
+def run_tk(data_file, size, repeat):
+    """
+    Time the same operations in a real DungeonTracker window.
+    :return: A list of result dictionaries.
+    """
+    # Imported here, the headless benchmarks do not need Tk or Pillow
+    from DungeonGuide import DungeonTracker
+    results = []
+    data = load_dungeon_data(data_file)
+    app = DungeonTracker(data, data_file, "QuestInfo", os.path.join(os.path.dirname(data_file), "themes.json"), "en.json")
+    app.update()
+    try:
+        states = [(FILTERS, ""), ({}, ""), ({}, "crystal"), ({}, "")]
+
+        def update_tree():
+            for selected_filters, query in states:
+                for category, items in app.filter_vars.items():
+                    for item, var in items.items():
+                        var.set(item in selected_filters.get(category, ()))
+                # Setting the search text runs update_tree through the variable trace
+                app.search_var.set(query)
+                app.update_tree()
+                app.update_idletasks()
+        results.append(result("tk", size, "update_tree", [duration / len(states) for duration in timed(update_tree, repeat)]))
+        results.append(result("tk", size, "apply_even_odd_tags", timed(
+            lambda: (apply_even_odd_tags(app.tree), app.update_idletasks()), repeat)))
+        results.append(result("tk", size, "reset_status", timed(
+            lambda: (app.reset_status(), app.update_idletasks()), repeat)))
+        results.append(result("tk", size, "save_dungeon_data", timed(lambda: save_dungeon_data(data_file, app.data), repeat)))
+    finally:
+        app.persistence.close()
+        app.destroy()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the tracker core on synthetic catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Catalog sizes in duties.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per operation.")
+    parser.add_argument("--tk", action="store_true", help="Also time a real Tk window, started under Xvfb if there is no display.")
+    parser.add_argument("--output", help="Write the results as JSON lines to this file instead of standard output.")
+    args = parser.parse_args(argv)
+
+    xvfb = start_xvfb() if args.tk else None
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    original_dir = os.getcwd()
+    try:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as work_dir:
+                data_file = os.path.join(work_dir, "duties.json")
+                write_catalog(data_file, size)
+                results = run_headless(data_file, size, args.repeat)
+                if args.tk:
+                    # The window keeps its preferences in the working directory
+                    os.chdir(work_dir)
+                    try:
+                        results += run_tk(data_file, size, args.repeat)
+                    finally:
+                        os.chdir(original_dir)
+                for entry in results:
+                    output.write(json.dumps(entry) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if xvfb is not None:
+            xvfb.terminate()
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
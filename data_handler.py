@@ -1,31 +1,239 @@
 import json
 import logging
 import os
+from collections import defaultdict
+from datetime import datetime, timezone
+import sqlite_store
+from duty_table import to_columnar, encode_duty
+from image_manifest import load_manifest
 
-# Initialize logging
-logging.basicConfig(filename='app.log', level=logging.DEBUG,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Default location of the user preferences when the data is stored as JSON
+PREFERENCES_FILE = 'preferences.json'
+# Default location of the character profiles when the data is stored as JSON
+PROFILES_FILE = 'profiles.json'
+
+# Treeview tags that only describe how a row is drawn and are never stored with a duty
+PRESENTATION_TAGS = ('evenrow', 'oddrow', 'unlocked')
 
 def load_dungeon_data(file_path):
     """
-    Load dungeon data from a JSON file.
-    :param file_path: The path to the JSON file containing dungeon data.
+    Load dungeon data from a JSON file, or from an SQLite database if the path ends in .db/.sqlite.
+    The duties are stored in a columnar DutyTable and appear in the data as DutyRecord views.
+    :param file_path: The path to the JSON file or database containing dungeon data.
     :return: A dictionary containing the loaded dungeon data.
     """
-    logging.info(f"Loading dungeon data from {file_path}.")
+    logger.info(f"Loading dungeon data from {file_path}.")
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        logging.info(f"Dungeon data loaded successfully from {file_path}.")
+        if sqlite_store.is_sqlite_path(file_path):
+            # Changes are applied to the database as they are made, there is no journal to replay
+            data = sqlite_store.load_dungeon_data(file_path)
+            to_columnar(data)
+            replayed = 0
+        else:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+            # Convert before replaying, so the duty registry built by the replay refers to the records
+            to_columnar(data)
+            replayed = replay_journal(file_path, data)
+        strip_presentation_tags(data)
+        logger.info(f"Dungeon data loaded successfully from {file_path} ({replayed} journal entries replayed).")
         return data
     except Exception as e:
-        logging.error(f"Failed to load dungeon data from {file_path}: {e}")
+        logger.error(f"Failed to load dungeon data from {file_path}: {e}")
         return {}
 
+def strip_presentation_tags(data):
+    """
+    Remove row striping and unlocked tags written into the data by older versions.
+    :param data: The dungeon data, cleaned in place.
+    """
+    for expansion in data:
+        for duty_type in expansion['duties']:
+            for duty in duty_type['duties']:
+                tags = duty.get('Tags')
+                if tags and any(tag in PRESENTATION_TAGS for tag in tags):
+                    duty['Tags'] = [tag for tag in tags if tag not in PRESENTATION_TAGS]
+
+def serialize_dungeon_data(data):
+    """
+    Serialize dungeon data to the JSON text stored in the data file.
+    """
+    return json.dumps(data, ensure_ascii=False, indent=4, default=encode_duty)
+
+def write_file_atomic(file_path, text):
+    """
+    Write text to a file by writing a temporary file next to it and renaming it over the original,
+    so a crash never leaves a half-written file behind.
+    :param file_path: The path of the file to write.
+    :param text: The text content.
+    """
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+
+def prepare_snapshot(file_path, data):
+    """
+    Capture the dungeon data in the form written by write_snapshot. This is the only step
+    that reads the data, so it is the only step that has to run while the data is not changing.
+    :param file_path: The path to the JSON file or database the snapshot is meant for.
+    :param data: The dungeon data.
+    """
+    if sqlite_store.is_sqlite_path(file_path):
+        return sqlite_store.duty_rows(data)
+    return serialize_dungeon_data(data)
+
+def write_snapshot(file_path, snapshot):
+    """
+    Write a snapshot prepared by prepare_snapshot.
+    """
+    if sqlite_store.is_sqlite_path(file_path):
+        sqlite_store.save_duty_rows(file_path, snapshot)
+    else:
+        # A full snapshot already contains every journaled change, so the journal is compacted with it
+        compact_journal(file_path, snapshot)
+
 def save_dungeon_data(file_path, data):
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-    logging.info(f"Dungeon data saved to {file_path}")
+    write_snapshot(file_path, prepare_snapshot(file_path, data))
+    logger.info(f"Dungeon data saved to {file_path}")
+
+# Size in bytes past which the journal is folded into a new snapshot of the data file
+JOURNAL_COMPACT_BYTES = 64 * 1024
+
+def journal_path(file_path):
+    """
+    Return the path of the mutation journal kept next to a data file.
+    """
+    return os.path.splitext(file_path)[0] + ".journal.jsonl"
+
+def history_path(file_path):
+    """
+    Return the path of the file collecting compacted journal entries, kept as an audit trail.
+    """
+    return os.path.splitext(file_path)[0] + ".history.jsonl"
+
+def journal_entry(op, key=None, value=None):
+    """
+    Build a journal entry describing one change to the dungeon data.
+    :param op: "status", "tags" or "reset".
+    :param key: The (expansion, type, name) key of the changed duty, None for "reset".
+    :param value: The new status or list of tags.
+    """
+    entry = {"time": datetime.now(timezone.utc).isoformat(timespec="seconds"), "op": op}
+    if key is not None:
+        entry["expansion"], entry["type"], entry["name"] = key
+    if value is not None:
+        entry["value"] = value
+    return entry
+
+def append_journal_entries(file_path, entries):
+    """
+    Append journal entries, one JSON object per line, to the journal of a data file.
+    For an SQLite database the entries are applied directly as single-row updates.
+    :param file_path: The path of the data file.
+    :param entries: The journal entries to append.
+    """
+    if sqlite_store.is_sqlite_path(file_path):
+        sqlite_store.apply_journal_entries(file_path, entries)
+        return
+    lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+    with open(journal_path(file_path), 'ab+') as f:
+        # Never join an entry onto a line left half-written by a crash
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                lines = "\n" + lines
+        f.write(lines.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+    logger.debug(f"Appended {len(entries)} journal entries for {file_path}.")
+
+def journal_size(file_path):
+    """
+    Return the size of the journal of a data file in bytes, 0 if there is none.
+    """
+    if sqlite_store.is_sqlite_path(file_path):
+        return 0
+    try:
+        return os.path.getsize(journal_path(file_path))
+    except OSError:
+        return 0
+
+def apply_journal_entry(data, entry):
+    """
+    Apply a single journal entry to the dungeon data.
+    :return: True if the entry was applied.
+    """
+    registry = get_duty_registry(data)
+    if entry["op"] == "reset":
+        for registry_id in registry.ids:
+            registry.set_status(registry_id, "Locked")
+            registry.set_tags(registry_id, [])
+        return True
+    registry_id = registry.lookup(entry.get("expansion"), entry.get("type"), entry.get("name"))
+    if registry_id is None:
+        logger.warning(f"Journal entry for unknown duty skipped: {entry}")
+        return False
+    if entry["op"] == "status":
+        registry.set_status(registry_id, entry["value"])
+    elif entry["op"] == "tags":
+        registry.set_tags(registry_id, entry["value"])
+    else:
+        logger.warning(f"Unknown journal operation skipped: {entry}")
+        return False
+    return True
+
+def replay_journal(file_path, data):
+    """
+    Replay the journal of a data file over the loaded snapshot.
+    A truncated last line, left by a crash during an append, is cut off the journal so that the
+    next append starts on a line of its own.
+    :param file_path: The path of the data file.
+    :param data: The dungeon data loaded from the snapshot.
+    :return: The number of entries applied.
+    """
+    path = journal_path(file_path)
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        content = f.read()
+    complete = content.rfind(b"\n") + 1
+    if complete < len(content):
+        logger.warning(f"Dropping a truncated last line of {len(content) - complete} bytes from {path}.")
+        with open(path, 'r+b') as f:
+            f.truncate(complete)
+            f.flush()
+            os.fsync(f.fileno())
+    replayed = 0
+    for line in content[:complete].decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping unreadable journal line in {path}.")
+            continue
+        if apply_journal_entry(data, entry):
+            replayed += 1
+    return replayed
+
+def compact_journal(file_path, text):
+    """
+    Write a new snapshot of the data file and move the journal entries it contains to the history file.
+    :param file_path: The path of the data file.
+    :param text: The serialized dungeon data, including every journaled change.
+    """
+    write_file_atomic(file_path, text)
+    path = journal_path(file_path)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as journal, open(history_path(file_path), 'a', encoding='utf-8') as history:
+            history.write(journal.read())
+        os.remove(path)
+    logger.info(f"Journal compacted into {file_path}.")
 
 def load_themes(file_path):
     """
@@ -33,14 +241,16 @@ def load_themes(file_path):
     :param file_path: The path to the JSON file containing themes.
     :return: A dictionary containing the loaded themes.
     """
-    logging.info(f"Loading themes from {file_path}.")
+    logger.info(f"Loading themes from {file_path}.")
     try:
+        if sqlite_store.is_sqlite_path(file_path):
+            return sqlite_store.load_setting(file_path, "themes")
         with open(file_path, 'r') as f:
             themes = json.load(f)
-        logging.info(f"Themes loaded successfully from {file_path}.")
+        logger.info(f"Themes loaded successfully from {file_path}.")
         return themes
     except Exception as e:
-        logging.error(f"Failed to load themes from {file_path}: {e}")
+        logger.error(f"Failed to load themes from {file_path}: {e}")
         return {}
 
 def save_themes(file_path, themes):
@@ -49,58 +259,206 @@ def save_themes(file_path, themes):
     :param file_path: The path to the JSON file where the themes will be saved.
     :param themes: The themes to be saved.
     """
-    logging.info(f"Saving themes to {file_path}.")
+    logger.info(f"Saving themes to {file_path}.")
     try:
+        if sqlite_store.is_sqlite_path(file_path):
+            sqlite_store.save_setting(file_path, "themes", themes)
+            return
         with open(file_path, 'w') as f:
             json.dump(themes, f, indent=4)
-        logging.info(f"Themes saved successfully to {file_path}.")
+        logger.info(f"Themes saved successfully to {file_path}.")
     except Exception as e:
-        logging.error(f"Failed to save themes to {file_path}: {e}")
+        logger.error(f"Failed to save themes to {file_path}: {e}")
 
-def load_preferences():
+def load_preferences(file_path=PREFERENCES_FILE):
     """
-    Load user preferences from a JSON file.
+    Load user preferences from a JSON file, or from the settings of an SQLite database.
+    :param file_path: The path to the preferences file or database.
     :return: A dictionary containing the loaded preferences.
     """
-    logging.info("Loading user preferences.")
+    logger.info("Loading user preferences.")
     try:
-        with open('preferences.json', 'r') as f:
-            preferences = json.load(f)
-        logging.info("User preferences loaded successfully.")
+        if sqlite_store.is_sqlite_path(file_path):
+            preferences = sqlite_store.load_setting(file_path, "preferences")
+        else:
+            with open(file_path, 'r') as f:
+                preferences = json.load(f)
+        logger.info("User preferences loaded successfully.")
         return preferences
     except Exception as e:
-        logging.error(f"Failed to load preferences: {e}")
+        logger.error(f"Failed to load preferences: {e}")
         return {}
 
-def save_preferences(preferences):
+def save_preferences(preferences, file_path=PREFERENCES_FILE):
     """
-    Save user preferences to a JSON file.
+    Save user preferences to a JSON file, or to the settings of an SQLite database.
     :param preferences: The preferences to be saved.
+    :param file_path: The path to the preferences file or database.
+    """
+    # Called on every filter change, so it only logs failures above debug level
+    logger.debug("Saving user preferences.")
+    try:
+        if sqlite_store.is_sqlite_path(file_path):
+            sqlite_store.save_setting(file_path, "preferences", preferences)
+        else:
+            with open(file_path, 'w') as f:
+                json.dump(preferences, f, indent=4)
+        logger.debug("User preferences saved successfully.")
+    except Exception as e:
+        logger.error(f"Failed to save preferences: {e}")
+
+def load_profiles(file_path=PROFILES_FILE):
+    """
+    Load the character profiles from a JSON file, or from the settings of an SQLite database.
+    :param file_path: The path to the profiles file or database.
+    :return: A dictionary with the current profile name and the stored profiles, empty if there are none yet.
     """
-    logging.info("Saving user preferences.")
+    logger.info("Loading character profiles.")
     try:
-        with open('preferences.json', 'w') as f:
-            json.dump(preferences, f, indent=4)
-        logging.info("User preferences saved successfully.")
+        if sqlite_store.is_sqlite_path(file_path):
+            return sqlite_store.load_setting(file_path, "profiles")
+        if not os.path.exists(file_path):
+            return {}
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
     except Exception as e:
-        logging.error(f"Failed to save preferences: {e}")
+        logger.error(f"Failed to load profiles: {e}")
+        return {}
+
+def save_profiles(profiles, file_path=PROFILES_FILE):
+    """
+    Save the character profiles to a JSON file, or to the settings of an SQLite database.
+    :param profiles: The profiles, as returned by load_profiles.
+    :param file_path: The path to the profiles file or database.
+    """
+    logger.info("Saving character profiles.")
+    try:
+        if sqlite_store.is_sqlite_path(file_path):
+            sqlite_store.save_setting(file_path, "profiles", profiles)
+        else:
+            write_file_atomic(file_path, json.dumps(profiles, ensure_ascii=False, indent=4))
+    except Exception as e:
+        logger.error(f"Failed to save profiles: {e}")
+
+def duty_id(exp_index, type_index, duty_index):
+    """
+    Build the stable id of a duty from its position in the data.
+    The id is also used as the duty's item id in the Treeview.
+    """
+    return f"{exp_index}:{type_index}:{duty_index}"
+
+class DutyRegistry:
+    """
+    Index of every duty in the data, keyed by duty id and by (expansion, type, name).
+    All changes to a duty's status or tags should go through the registry.
+    """
+
+    def __init__(self, data):
+        """
+        :param data: The entire data structure containing all duties.
+        """
+        self.data = data
+        self.ids = []
+        self.positions = {}
+        self.duties = {}
+        self.keys = {}
+        self.by_key = {}
+        self.by_name = defaultdict(list)
+        for exp_index, expansion in enumerate(data):
+            for type_index, duty_type in enumerate(expansion['duties']):
+                for duty_index, duty in enumerate(duty_type['duties']):
+                    key = (expansion['expansion'], duty_type['type'], duty['Name'])
+                    registry_id = duty_id(exp_index, type_index, duty_index)
+                    self.positions[registry_id] = len(self.ids)
+                    self.ids.append(registry_id)
+                    self.duties[registry_id] = duty
+                    self.keys[registry_id] = key
+                    self.by_key[key] = registry_id
+                    self.by_name[duty['Name']].append(registry_id)
+        logger.info(f"Duty registry built with {len(self.ids)} duties.")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, registry_id):
+        return registry_id in self.duties
+
+    def get(self, registry_id):
+        """
+        Return the duty dictionary for a duty id, or None if it is unknown.
+        """
+        return self.duties.get(registry_id)
+
+    def key(self, registry_id):
+        """
+        Return the (expansion, type, name) key of a duty id.
+        """
+        return self.keys[registry_id]
+
+    def lookup(self, expansion, duty_type, duty_name):
+        """
+        Return the id of the duty with the given expansion, type and name, or None.
+        """
+        return self.by_key.get((expansion, duty_type, duty_name))
+
+    def find_by_name(self, duty_name):
+        """
+        Return the ids of every duty with the given name. Names can repeat across expansions.
+        """
+        return list(self.by_name.get(duty_name, ()))
+
+    def set_status(self, registry_id, new_status):
+        self.duties[registry_id]['Status'] = new_status
+        # Called for every duty on a reset, only build the message when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Status for {registry_id} updated to {new_status}.")
+
+    def set_tags(self, registry_id, new_tags):
+        self.duties[registry_id]['Tags'] = list(new_tags)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Tags for {registry_id} updated to {new_tags}.")
 
-def update_status_in_data(data, duty_name, new_status):
+# Registries for data structures handed to the module level helpers, keyed by id(data)
+_registries = {}
+
+def get_duty_registry(data):
+    """
+    Return the duty registry for a data structure, building it on first use.
+    :param data: The entire data structure containing all duties.
+    """
+    registry = _registries.get(id(data))
+    if registry is None or registry.data is not data:
+        registry = DutyRegistry(data)
+        _registries.clear()
+        _registries[id(data)] = registry
+    return registry
+
+def update_status_in_data(data, duty_name, new_status, expansion=None, duty_type=None):
     """
     Update the status of a specific duty in the data.
     :param data: The entire data structure containing all duties.
     :param duty_name: The name of the duty to update.
     :param new_status: The new status to apply to the duty.
+    :param expansion: The expansion of the duty, required when the name is not unique.
+    :param duty_type: The type of the duty, required when the name is not unique.
     """
-    logging.info(f"Updating status for duty: {duty_name} to {new_status}.")
-    for expansion in data:
-        for duty_type in expansion['duties']:
-            for duty in duty_type['duties']:
-                if duty['Name'] == duty_name:
-                    duty['Status'] = new_status
-                    logging.info(f"Status for {duty_name} updated to {new_status}.")
-                    return
-    logging.warning(f"Duty {duty_name} not found. Status update failed.")
+    logger.info(f"Updating status for duty: {duty_name} to {new_status}.")
+    registry = get_duty_registry(data)
+    if expansion is not None and duty_type is not None:
+        registry_id = registry.lookup(expansion, duty_type, duty_name)
+        matches = [registry_id] if registry_id else []
+    else:
+        matches = [registry_id for registry_id in registry.find_by_name(duty_name)
+                   if expansion in (None, registry.key(registry_id)[0])
+                   and duty_type in (None, registry.key(registry_id)[1])]
+    if not matches:
+        logger.warning(f"Duty {duty_name} not found. Status update failed.")
+        return
+    if len(matches) > 1:
+        logger.warning(f"Duty name {duty_name} is ambiguous ({len(matches)} matches). Status update failed.")
+        return
+    registry.set_status(matches[0], new_status)
+    logger.info(f"Status for {duty_name} updated to {new_status}.")
 
 def save_state(file_path, state_data):
     """
@@ -108,31 +466,22 @@ def save_state(file_path, state_data):
     :param file_path: The path to the JSON file where the state will be saved.
     :param state_data: The state data to be saved.
     """
-    logging.info(f"Saving application state to {file_path}.")
+    logger.info(f"Saving application state to {file_path}.")
     try:
         with open(file_path, 'w') as f:
             json.dump(state_data, f, indent=4)
-        logging.info(f"Application state saved successfully to {file_path}.")
+        logger.info(f"Application state saved successfully to {file_path}.")
     except Exception as e:
-        logging.error(f"Failed to save application state to {file_path}: {e}")
+        logger.error(f"Failed to save application state to {file_path}: {e}")
 
 def get_image_path(image_folder, expansion, duty_type, unlock_text):
     """
     Construct the path to the image file based on the provided expansion, duty type, and unlock text.
+    Images are looked up in the image manifest, ignoring case and punctuation in the file names.
     :param image_folder: Root folder where all images are stored.
     :param expansion: The expansion name.
     :param duty_type: The type of duty (Dungeons, Trials, Raids).
     :param unlock_text: The unlock text from the duty.
     :return: The full path to the image file, or None if the image doesn't exist.
     """
-    # Sanitize the unlock text to create the image filename
-    image_name = "".join(c for c in unlock_text if c.isalnum()).lower() + ".jpg"
-    
-    # Construct the image path
-    image_path = os.path.join(image_folder, expansion, duty_type, image_name)
-    
-    # Check if the image exists
-    if os.path.exists(image_path):
-        return image_path
-    else:
-        return None
+    return load_manifest(image_folder).path(expansion, duty_type, unlock_text)
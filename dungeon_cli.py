@@ -0,0 +1,113 @@
+import argparse
+import logging
+import os
+import sys
+from data_handler import load_dungeon_data, save_dungeon_data, PROFILES_FILE
+from profile_store import ProfileStore
+from sqlite_store import is_sqlite_path
+from tracker_model import TrackerModel
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+STATUS_BY_COMMAND = {"unlock": "Unlocked", "lock": "Locked"}
+
+def default_data_file():
+    # Same choice as DungeonGuide.py: the SQLite database once the data has been migrated
+    return "duties.db" if os.path.exists("duties.db") else "duties.json"
+
+def parse_level_range(text):
+    """
+    Parse "50" or "50-60" into inclusive (low, high) levels.
+    """
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+def select_duties(model, pattern=None, levels=None, expansions=None, duty_types=None, names=None):
+    """
+    Find the duties matching every given selector, in catalog order.
+    :param model: The TrackerModel holding the data.
+    :param pattern: A name pattern using the search syntax of the tracker ('*' wildcards, "quoted" alternatives).
+    :param levels: Inclusive (low, high) level range.
+    :param expansions: Expansion names.
+    :param duty_types: Duty type names.
+    :param names: Exact duty names, e.g. read from standard input.
+    :return: A (duty ids, unknown names) tuple.
+    """
+    selected_filters = {"Expansion": set(expansions or ()), "Duty Type": set(duty_types or ())}
+    positions = model.matching_positions(selected_filters, (pattern or "").lower())
+    duty_ids = []
+    for position in positions:
+        duty_id = model.duty_ids[position]
+        duty = model.duty(duty_id)
+        if levels and not levels[0] <= int(duty["Level"]) <= levels[1]:
+            continue
+        duty_ids.append(duty_id)
+
+    unknown = []
+    if names is not None:
+        named = set()
+        for name in names:
+            matches = model.registry.find_by_name(name)
+            if not matches:
+                unknown.append(name)
+            named.update(matches)
+        duty_ids = [duty_id for duty_id in duty_ids if duty_id in named]
+    return duty_ids, unknown
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lock or unlock many duties at once, saving the data file once.")
+    parser.add_argument("command", choices=sorted(STATUS_BY_COMMAND), help="The status to give the selected duties.")
+    parser.add_argument("--data", default=None, help="The data file (duties.json, or duties.db when it exists).")
+    parser.add_argument("--name", help='Name pattern, e.g. "the *keep" or "sastasha".')
+    parser.add_argument("--level", type=parse_level_range, help='Level or inclusive level range, e.g. "50" or "50-60".')
+    parser.add_argument("--expansion", action="append", help="Expansion name, can be repeated.")
+    parser.add_argument("--type", dest="duty_types", action="append", help="Duty type (Dungeons, Trials, ...), can be repeated.")
+    parser.add_argument("--stdin", action="store_true", help="Read duty names from standard input, one per line.")
+    parser.add_argument("--profile", help="Character profile to change, created if it does not exist. Defaults to the current profile.")
+    parser.add_argument("--dry-run", action="store_true", help="List the selected duties without changing anything.")
+    args = parser.parse_args(argv)
+
+    if not (args.name or args.level or args.expansion or args.duty_types or args.stdin):
+        parser.error("select duties with at least one of --name, --level, --expansion, --type or --stdin")
+
+    data_file = args.data or default_data_file()
+    data = load_dungeon_data(data_file)
+    if not data:
+        print(f"No dungeon data could be loaded from {data_file}.", file=sys.stderr)
+        return 1
+    model = TrackerModel(data, db_path=data_file if is_sqlite_path(data_file) else None)
+    profiles = ProfileStore(model, data_file if is_sqlite_path(data_file) else PROFILES_FILE)
+    profile = args.profile or profiles.current
+    if profile not in profiles.profiles and not args.dry_run:
+        # Saved below with the status changes, so the invocation writes the profiles once
+        profiles.create(profile, save=False)
+
+    names = [line.strip() for line in sys.stdin if line.strip()] if args.stdin else None
+    duty_ids, unknown = select_duties(model, args.name, args.level, args.expansion, args.duty_types, names)
+    for name in unknown:
+        print(f"Unknown duty: {name}", file=sys.stderr)
+
+    new_status = STATUS_BY_COMMAND[args.command]
+    if args.dry_run:
+        for duty_id in duty_ids:
+            expansion, duty_type = model.location(duty_id)
+            duty = model.duty(duty_id)
+            status = profiles.status(profile, duty_id) if profile in profiles.profiles else "Locked"
+            print(f"{expansion} / {duty_type} / {duty['Name']} ({status})")
+        print(f"{len(duty_ids)} duties would be set to {new_status}.")
+        return 0
+
+    # Every change is made in memory first and then written in a single save
+    changed = profiles.set_status(profile, duty_ids, new_status)
+    if profile == profiles.current:
+        if changed:
+            save_dungeon_data(data_file, data)
+    else:
+        profiles.save()
+    print(f"{changed} duties set to {new_status} in profile {profile} ({len(duty_ids) - changed} already were).")
+    return 0
+
+if __name__ == "__main__":
+    configure_logging()
+    sys.exit(main())
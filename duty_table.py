@@ -0,0 +1,254 @@
+import logging
+from array import array
+from collections.abc import MutableMapping
+
+logger = logging.getLogger(__name__)
+
+# Keys of a duty, in the order they are written to duties.json
+DUTY_FIELDS = ("Name", "Level", "Unlock", "Quest Type", "Status", "Tags")
+
+# Tables whose rows are exactly the duties of a data structure in catalog order, keyed by id(data)
+_tables = {}
+
+# Number of distinct values a column stored as one-byte codes can hold
+MAX_CODES = 256
+
+class DutyTable:
+    """
+    Columnar storage for every duty of the catalog.
+
+    Names and unlock quests are indexes into one table of interned strings, levels are stored in
+    an array('H'), quest types and statuses are small codes into their list of distinct values
+    stored in an array('B'), and tags are only kept for the few duties that have any. Row N is the
+    Nth duty added, which is the Nth duty in catalog order when the whole data is converted at once.
+
+    Code reading the data sees DutyRecord views, which behave like the duty dictionaries they replace.
+    """
+
+    def __init__(self):
+        self.strings = []
+        # Lookup of the interned strings, only kept while strings are being added (see compact)
+        self.string_ids = {}
+        self.names = array('I')
+        self.unlocks = array('I')
+        self.levels = array('H')
+        self.quest_types = []
+        self.quest_type_codes = array('B')
+        self.statuses = ["Locked", "Unlocked"]
+        self.status_codes = array('B')
+        # Row -> tuple of tags, for the rows that have tags
+        self.tags = {}
+
+    def __len__(self):
+        return len(self.levels)
+
+    def intern(self, text):
+        if self.string_ids is None:
+            self.string_ids = {string: string_id for string_id, string in enumerate(self.strings)}
+        string_id = self.string_ids.get(text)
+        if string_id is None:
+            string_id = self.string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    @staticmethod
+    def code(values, value):
+        """
+        Return the code of a value in a list of distinct values, adding it if it is new.
+        """
+        try:
+            return values.index(value)
+        except ValueError:
+            if len(values) >= MAX_CODES:
+                raise ValueError(f"Too many distinct values to code {value!r}")
+            values.append(value)
+            return len(values) - 1
+
+    def compact(self):
+        """
+        Drop the string lookup once loading is done; names rarely change afterwards, and it is
+        rebuilt on the next intern.
+        """
+        self.string_ids = None
+
+    @staticmethod
+    def storable(duty):
+        """
+        Check whether a duty dictionary can be stored in the table and written back unchanged.
+        """
+        return (tuple(duty) == DUTY_FIELDS and isinstance(duty["Name"], str) and isinstance(duty["Unlock"], str)
+                and isinstance(duty["Quest Type"], str) and isinstance(duty["Status"], str)
+                and type(duty["Level"]) is int and 0 <= duty["Level"] <= 0xFFFF
+                and isinstance(duty["Tags"], list) and all(isinstance(tag, str) for tag in duty["Tags"]))
+
+    def append(self, duty):
+        """
+        Store a duty dictionary as a new row.
+        :return: The DutyRecord view of the row.
+        """
+        row = len(self)
+        self.names.append(self.intern(duty["Name"]))
+        self.unlocks.append(self.intern(duty["Unlock"]))
+        self.levels.append(duty["Level"])
+        self.quest_type_codes.append(self.code(self.quest_types, duty["Quest Type"]))
+        self.status_codes.append(self.code(self.statuses, duty["Status"]))
+        if duty["Tags"]:
+            self.tags[row] = tuple(duty["Tags"])
+        return DutyRecord(self, row)
+
+    def get(self, row, key):
+        if key == "Name":
+            return self.strings[self.names[row]]
+        if key == "Level":
+            return self.levels[row]
+        if key == "Unlock":
+            return self.strings[self.unlocks[row]]
+        if key == "Quest Type":
+            return self.quest_types[self.quest_type_codes[row]]
+        if key == "Status":
+            return self.statuses[self.status_codes[row]]
+        if key == "Tags":
+            return list(self.tags.get(row, ()))
+        raise KeyError(key)
+
+    def set(self, row, key, value):
+        if key == "Name":
+            self.names[row] = self.intern(value)
+        elif key == "Level":
+            self.levels[row] = value
+        elif key == "Unlock":
+            self.unlocks[row] = self.intern(value)
+        elif key == "Quest Type":
+            self.quest_type_codes[row] = self.code(self.quest_types, value)
+        elif key == "Status":
+            self.status_codes[row] = self.code(self.statuses, value)
+        elif key == "Tags":
+            if value:
+                self.tags[row] = tuple(value)
+            else:
+                self.tags.pop(row, None)
+        else:
+            raise KeyError(f"Duties have no {key!r} column")
+
+class DutyRecord(MutableMapping):
+    """
+    A view of one row of a DutyTable, used in place of a duty dictionary.
+    duty["Status"] reads and writes the table; "Tags" is returned as a new list, so tags are
+    changed by assigning a list rather than by modifying the returned one.
+    """
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.table.get(self.row, key)
+
+    def __setitem__(self, key, value):
+        self.table.set(self.row, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("Duty columns cannot be removed")
+
+    def __iter__(self):
+        return iter(DUTY_FIELDS)
+
+    def __len__(self):
+        return len(DUTY_FIELDS)
+
+    def __contains__(self, key):
+        return key in DUTY_FIELDS
+
+    def __repr__(self):
+        return f"DutyRecord({self.to_dict()!r})"
+
+    def to_dict(self):
+        # Called for every duty on a save, so the columns are read directly
+        table, row = self.table, self.row
+        strings = table.strings
+        return {
+            "Name": strings[table.names[row]],
+            "Level": table.levels[row],
+            "Unlock": strings[table.unlocks[row]],
+            "Quest Type": table.quest_types[table.quest_type_codes[row]],
+            "Status": table.statuses[table.status_codes[row]],
+            "Tags": list(table.tags.get(row, ())),
+        }
+
+def code_bitmaps(codes, values):
+    """
+    Build one bitmap per value of a coded column, bit N standing for row N.
+    The column is turned into a string of '0'/'1' per value with bytes.translate, so no Python
+    code runs per row.
+    :param codes: The codes of the column, one byte per row.
+    :param values: The list of values the codes stand for.
+    :return: A dictionary of value -> bitmap, for the values used by at least one row.
+    """
+    codes = bytes(codes)
+    bitmaps = {}
+    for code, value in enumerate(values):
+        translation = bytearray(b'0' * 256)
+        translation[code] = ord('1')
+        bits = codes.translate(translation)[::-1]
+        if b'1' in bits:
+            bitmaps[value] = int(bits, 2)
+    return bitmaps
+
+def to_columnar(data):
+    """
+    Move every duty of the data into a shared DutyTable, replacing the dictionaries by DutyRecord views.
+    Duties with unexpected keys or values are left as dictionaries.
+    :param data: The dungeon data, converted in place.
+    :return: The table, or None if the duties have too many distinct values to be stored in one.
+    """
+    table = DutyTable()
+    storable = []
+    kept = 0
+    for expansion in data:
+        for duty_type in expansion['duties']:
+            duties = duty_type['duties']
+            for index, duty in enumerate(duties):
+                if isinstance(duty, dict) and DutyTable.storable(duty):
+                    storable.append((duties, index))
+                else:
+                    kept += 1
+
+    # Check the coded columns first, running out of codes halfway would leave the data half converted
+    for key, values in (("Quest Type", table.quest_types), ("Status", table.statuses)):
+        distinct = set(values).union(duties[index][key] for duties, index in storable)
+        if len(distinct) > MAX_CODES:
+            logger.error(f"The duties have {len(distinct)} distinct {key} values, more than the {MAX_CODES} "
+                         f"the duty table can store. They are kept as dictionaries.")
+            return None
+
+    for duties, index in storable:
+        duties[index] = table.append(duties[index])
+    table.compact()
+    if kept:
+        logger.warning(f"{kept} duties kept as dictionaries, their fields do not fit the duty table.")
+    else:
+        # Rows are in catalog order, so the columns can stand in for a scan over the data
+        _tables.clear()
+        _tables[id(data)] = (data, table)
+    logger.info(f"Duty table built with {len(table)} duties and {len(table.strings)} distinct strings.")
+    return table
+
+def duty_table(data):
+    """
+    Return the DutyTable holding every duty of the data in catalog order, or None if the data
+    was not (entirely) converted by to_columnar.
+    """
+    entry = _tables.get(id(data))
+    if entry is None or entry[0] is not data:
+        return None
+    return entry[1]
+
+def encode_duty(value):
+    """
+    json.dumps default hook writing DutyRecord views as the dictionaries they stand for.
+    """
+    if isinstance(value, DutyRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
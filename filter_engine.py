@@ -0,0 +1,138 @@
+import logging
+from duty_table import duty_table, code_bitmaps
+
+logger = logging.getLogger(__name__)
+
+LEVEL_RANGES = ["10-15", "15-20", "20-25", "25-30", "35-40", "45-50", "50-55", "55-60", "65-70", "75-80", "85-90", "90-95", "95-100"]
+
+# Parse the ranges once instead of for every duty
+_PARSED_LEVEL_RANGES = [(label, *map(int, label.split('-'))) for label in LEVEL_RANGES]
+
+def get_level_range(level):
+    """
+    Return the label of the first level range containing a level, or "" if none does.
+    :param level: The duty level (int or numeric string).
+    """
+    level = int(level)
+    for label, start, end in _PARSED_LEVEL_RANGES:
+        if start <= level <= end:
+            return label
+    return ""
+
+def iter_bits(mask):
+    """
+    Yield the positions of the set bits of a bitmap in increasing order.
+    """
+    bits = bin(mask)[:1:-1]
+    position = bits.find("1")
+    while position != -1:
+        yield position
+        position = bits.find("1", position + 1)
+
+class FilterEngine:
+    """
+    Precomputed bitmaps for every value of every filter category.
+
+    Bit N of a bitmap stands for the Nth duty in catalog order (expansion, then duty type,
+    then duty). A filter combination is answered by OR-ing the bitmaps of the selected values
+    within a category and AND-ing the categories together.
+    """
+
+    CATEGORIES = ("Expansion", "Level", "Quest Type", "Duty Type", "Status")
+
+    def __init__(self, data):
+        """
+        :param data: The dungeon data as loaded by load_dungeon_data.
+        """
+        self.bitmaps = {category: {} for category in self.CATEGORIES}
+        table = duty_table(data)
+        if table is not None:
+            self.build_from_table(data, table)
+            logger.info(f"Filter bitmaps built for {self.size} duties from the duty table.")
+            return
+        self.statuses = []
+        position = 0
+        for expansion in data:
+            for duty_type in expansion["duties"]:
+                for duty in duty_type["duties"]:
+                    bit = 1 << position
+                    values = {
+                        "Expansion": expansion["expansion"],
+                        "Level": get_level_range(duty["Level"]),
+                        "Quest Type": duty["Quest Type"],
+                        "Duty Type": duty_type["type"],
+                        "Status": duty["Status"],
+                    }
+                    for category, value in values.items():
+                        bitmaps = self.bitmaps[category]
+                        bitmaps[value] = bitmaps.get(value, 0) | bit
+                    self.statuses.append(duty["Status"])
+                    position += 1
+        self.size = position
+        self.all = (1 << position) - 1
+        logger.info(f"Filter bitmaps built for {self.size} duties.")
+
+    def build_from_table(self, data, table):
+        """
+        Build the bitmaps from the columns of a DutyTable whose rows are in catalog order.
+        """
+        position = 0
+        for expansion in data:
+            for duty_type in expansion["duties"]:
+                # The duties of a duty type are a contiguous run of bits
+                count = len(duty_type["duties"])
+                run = ((1 << count) - 1) << position
+                for category, value in (("Expansion", expansion["expansion"]), ("Duty Type", duty_type["type"])):
+                    bitmaps = self.bitmaps[category]
+                    bitmaps[value] = bitmaps.get(value, 0) | run
+                position += count
+        self.size = position
+        self.all = (1 << position) - 1
+
+        # Code every distinct level by its range once, then split the codes like the other coded columns
+        labels = LEVEL_RANGES + [""]
+        level_codes = {level: labels.index(get_level_range(level)) for level in set(table.levels)}
+        self.bitmaps["Level"] = code_bitmaps(bytes(map(level_codes.__getitem__, table.levels)), labels)
+        self.bitmaps["Quest Type"] = code_bitmaps(table.quest_type_codes, table.quest_types)
+        self.bitmaps["Status"] = code_bitmaps(table.status_codes, table.statuses)
+        self.statuses = [table.statuses[code] for code in table.status_codes]
+
+    def match(self, selected_filters):
+        """
+        Compute the bitmap of duties passing a filter combination.
+        :param selected_filters: Dict mapping a category to the set of selected values.
+                                 Categories with no selected values do not filter.
+        :return: The bitmap of matching duties.
+        """
+        result = self.all
+        for category, values in selected_filters.items():
+            if not values or category not in self.bitmaps:
+                continue
+            bitmaps = self.bitmaps[category]
+            selected = 0
+            for value in values:
+                selected |= bitmaps.get(value, 0)
+            result &= selected
+        return result
+
+    def set_status(self, position, new_status):
+        """
+        Move a duty from its current status bitmap to the bitmap of its new status.
+        :param position: The position of the duty in catalog order.
+        :param new_status: The new status of the duty.
+        """
+        old_status = self.statuses[position]
+        if old_status == new_status:
+            return
+        bit = 1 << position
+        bitmaps = self.bitmaps["Status"]
+        bitmaps[old_status] &= ~bit
+        bitmaps[new_status] = bitmaps.get(new_status, 0) | bit
+        self.statuses[position] = new_status
+
+    def reset_status(self, new_status):
+        """
+        Give every duty the same status.
+        """
+        self.bitmaps["Status"] = {new_status: self.all}
+        self.statuses = [new_status] * self.size
@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+import struct
+import sys
+from asset_pack import find_pack, open_asset
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'image_manifest.json'
+MANIFEST_VERSION = 1
+IMAGE_EXTENSIONS = (".jpg", ".jpeg")
+# JPEG start-of-frame markers, which carry the image dimensions
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Manifests already loaded, by image folder
+_manifests = {}
+
+def image_key(text):
+    """
+    Normalize a name for matching: only letters and digits, lowercased.
+    "Hallo Halatali", "HalloHalatali.jpg" and "hallohalatali" all give "hallohalatali".
+    """
+    return "".join(c for c in text if c.isalnum()).lower()
+
+def image_dimensions(path):
+    """
+    Read the (width, height) of a JPEG or PNG file from its header without decoding it.
+    Some of the quest images are PNG files with a .jpg extension.
+    :return: The dimensions, or None if the file is not a readable JPEG or PNG.
+    """
+    try:
+        with open_asset(path) as file:
+            signature = file.read(2)
+            if signature == b'\x89P':
+                header = file.read(22)
+                if header[:6] != b'NG\r\n\x1a\n' or header[10:14] != b'IHDR':
+                    return None
+                return struct.unpack('>II', header[14:22])
+            if signature != b'\xff\xd8':
+                return None
+            while True:
+                marker = file.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                if marker[1] in (0x01, 0xD8) or 0xD0 <= marker[1] <= 0xD7:
+                    continue
+                length = struct.unpack('>H', file.read(2))[0]
+                if marker[1] in _SOF_MARKERS:
+                    height, width = struct.unpack('>xHH', file.read(5))
+                    return width, height
+                file.seek(length - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+def directory_mtimes(image_folder):
+    """
+    Return the modification time of every directory under the image folder, by relative path.
+    Adding, removing or renaming an image changes the mtime of its directory.
+    A packed image folder is represented by the modification time of its pack.
+    """
+    pack = find_pack(image_folder)
+    if pack is not None:
+        return {pack.path: pack.mtime_ns}
+    mtimes = {}
+    for directory, _, _ in os.walk(image_folder):
+        mtimes[os.path.relpath(directory, image_folder)] = os.stat(directory).st_mtime_ns
+    return mtimes
+
+class ImageManifest:
+    """
+    Index of the quest info images under an image folder, built once instead of probing the
+    filesystem for every lookup.
+
+    Images are stored under QuestInfo/<Expansion>/<Type>/<name>.jpg; entries are keyed by the
+    normalized (image_key) expansion, type and file name, so differences in case or punctuation
+    between the duty data and the file names do not matter.
+    """
+
+    def __init__(self, image_folder, entries=None, mtimes=None):
+        """
+        :param image_folder: Root folder of the images.
+        :param entries: Dict mapping "<expansion>/<type>/<name>" keys to entries with the
+                        relative path, size in bytes and (width, height) of each image.
+        :param mtimes: Directory mtimes the entries were built from.
+        """
+        self.image_folder = image_folder
+        self.entries = entries or {}
+        self.mtimes = mtimes or {}
+
+    @classmethod
+    def build(cls, image_folder):
+        """
+        Scan an image folder and build its manifest.
+        """
+        pack = find_pack(image_folder)
+        if pack is not None:
+            files = [(os.path.join(*name.split('/')), pack.size(name)) for name in pack.names()]
+        else:
+            files = []
+            for directory, _, file_names in os.walk(image_folder):
+                for file_name in file_names:
+                    path = os.path.join(directory, file_name)
+                    files.append((os.path.relpath(path, image_folder), os.path.getsize(path)))
+
+        entries = {}
+        for relative_path, size in files:
+            parts = relative_path.split(os.sep)
+            stem, extension = os.path.splitext(parts[-1])
+            if len(parts) != 3 or extension.lower() not in IMAGE_EXTENSIONS:
+                continue
+            key = cls.key(parts[0], parts[1], stem)
+            if key in entries:
+                logger.warning(f"Image {relative_path} has the same name as {entries[key]['path']}, ignoring it.")
+                continue
+            entries[key] = {
+                "path": relative_path,
+                "size": size,
+                "dimensions": image_dimensions(os.path.join(image_folder, relative_path)),
+            }
+        has_source = pack is not None or os.path.isdir(image_folder)
+        manifest = cls(image_folder, entries, directory_mtimes(image_folder) if has_source else {})
+        logger.info(f"Image manifest built for {image_folder} with {len(entries)} images.")
+        return manifest
+
+    @staticmethod
+    def key(expansion, duty_type, name):
+        return f"{image_key(expansion)}/{image_key(duty_type)}/{image_key(name)}"
+
+    def is_current(self):
+        """
+        Check whether no directory under the image folder, or its pack, changed since the manifest was built.
+        """
+        if find_pack(self.image_folder) is None and not os.path.isdir(self.image_folder):
+            return not self.entries
+        return directory_mtimes(self.image_folder) == self.mtimes
+
+    def lookup(self, expansion, duty_type, unlock_text):
+        """
+        Find the manifest entry of a duty's image.
+        :return: The entry, or None if the duty has no image.
+        """
+        return self.entries.get(self.key(expansion, duty_type, unlock_text))
+
+    def path(self, expansion, duty_type, unlock_text):
+        """
+        Return the full path to a duty's image, or None if it has no image.
+        """
+        entry = self.lookup(expansion, duty_type, unlock_text)
+        return os.path.join(self.image_folder, entry["path"]) if entry else None
+
+    def report(self, data):
+        """
+        Compare the manifest with the duty data.
+        :param data: The dungeon data as loaded by load_dungeon_data.
+        :return: A (missing, orphaned) tuple: "<expansion>/<type>/<duty>" names of duties without an
+                 image, and relative paths of images no duty refers to.
+        """
+        missing = []
+        used = set()
+        for expansion in data:
+            for duty_type in expansion["duties"]:
+                for duty in duty_type["duties"]:
+                    key = self.key(expansion["expansion"], duty_type["type"], duty["Unlock"])
+                    if key in self.entries:
+                        used.add(key)
+                    else:
+                        missing.append(f"{expansion['expansion']}/{duty_type['type']}/{duty['Name']}")
+        orphaned = sorted(entry["path"] for key, entry in self.entries.items() if key not in used)
+        return missing, orphaned
+
+    def to_json(self):
+        return {"version": MANIFEST_VERSION, "image_folder": self.image_folder, "mtimes": self.mtimes, "entries": self.entries}
+
+def load_manifest(image_folder, cache_file=MANIFEST_FILE):
+    """
+    Get the manifest of an image folder. It is built once per process and cached on disk;
+    the cached copy is reused as long as no directory under the image folder changed.
+    :param image_folder: Root folder of the images.
+    :param cache_file: The path of the on-disk cache, or None to skip it.
+    :return: The ImageManifest.
+    """
+    manifest = _manifests.get(image_folder)
+    if manifest is not None:
+        return manifest
+
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as file:
+                cached = json.load(file)
+            if cached.get("version") == MANIFEST_VERSION and cached.get("image_folder") == image_folder:
+                entries = {key: dict(entry, dimensions=tuple(entry["dimensions"]) if entry["dimensions"] else None)
+                           for key, entry in cached["entries"].items()}
+                manifest = ImageManifest(image_folder, entries, cached["mtimes"])
+                if not manifest.is_current():
+                    logger.info(f"Image folder {image_folder} changed, rebuilding the manifest.")
+                    manifest = None
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to read image manifest {cache_file}: {e}")
+            manifest = None
+
+    if manifest is None:
+        manifest = ImageManifest.build(image_folder)
+        if cache_file:
+            try:
+                with open(cache_file, 'w', encoding='utf-8') as file:
+                    json.dump(manifest.to_json(), file, ensure_ascii=False)
+            except OSError as e:
+                logger.error(f"Failed to write image manifest {cache_file}: {e}")
+
+    _manifests[image_folder] = manifest
+    return manifest
+
+def forget_manifest(image_folder):
+    """
+    Drop the in-memory manifest of an image folder, so the next lookup checks the folder again.
+    """
+    _manifests.pop(image_folder, None)
+
+if __name__ == "__main__":
+    configure_logging()
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python image_manifest.py <duties.json> [image folder]")
+        sys.exit(1)
+    # Imported here, data_handler imports this module
+    from data_handler import load_dungeon_data
+    folder = sys.argv[2] if len(sys.argv) == 3 else "QuestInfo"
+    missing, orphaned = load_manifest(folder).report(load_dungeon_data(sys.argv[1]))
+    print(f"Duties without an image ({len(missing)}):")
+    for name in missing:
+        print(f"  {name}")
+    print(f"Images without a duty ({len(orphaned)}):")
+    for path in orphaned:
+        print(f"  {path}")
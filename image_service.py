@@ -0,0 +1,235 @@
+import logging
+import queue
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageTk
+from thumbnails import best_variant
+from asset_pack import open_asset
+
+logger = logging.getLogger(__name__)
+
+# Decoded images kept in memory, counted as 4 bytes per pixel
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_WORKERS = 2
+# Milliseconds between checks for finished decodes while some are pending
+POLL_INTERVAL = 20
+# Decoded bytes a single prefetch run may add to the cache
+DEFAULT_PREFETCH_BYTES = 16 * 1024 * 1024
+
+def decode_image(path, max_size=None, image_folder=None):
+    """
+    Decode an image file, scaled down to fit within max_size. Runs on a worker thread.
+    :param path: The path of the image file.
+    :param max_size: Optional (width, height) the image must fit in; it is never scaled up.
+    :param image_folder: Optional root folder of the images; if given, the smallest pre-scaled
+                         variant that is large enough is decoded instead of the original.
+    :return: The decoded PIL image.
+    """
+    if max_size and image_folder:
+        path = best_variant(image_folder, path, max_size)
+    with open_asset(path) as file, Image.open(file) as img:
+        if max_size:
+            # Let the JPEG decoder skip detail that would be thrown away by the resize anyway
+            img.draft("RGB", max_size)
+        img = img.convert("RGB")
+    if max_size:
+        img.thumbnail(max_size)
+    return img
+
+class CancelToken:
+    """
+    A flag shared between the code starting background work and the work itself, so that
+    work which is no longer needed can be skipped.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class ImageService:
+    """
+    Decode images on a pool of worker threads and keep the results in a byte-bounded LRU cache.
+
+    Decoding and scaling happen off the Tk thread; finished images are handed back through
+    after() polling, where the PhotoImage is created and the callbacks run. Requests for an
+    image that is already being decoded share the same decode.
+    """
+
+    def __init__(self, root, image_folder=None, max_bytes=DEFAULT_CACHE_BYTES, workers=DEFAULT_WORKERS):
+        """
+        :param root: The Tk widget used to schedule callbacks on the Tk thread.
+        :param image_folder: Optional root folder of the images, to decode pre-scaled variants from.
+        :param max_bytes: Size of the cache in bytes of decoded pixels.
+        :param workers: Number of decoding threads.
+        """
+        self.root = root
+        self.image_folder = image_folder
+        self.max_bytes = max_bytes
+        # (path, max_size) -> PhotoImage, least recently used first
+        self.cache = OrderedDict()
+        self.sizes = {}
+        self.cache_bytes = 0
+        # (path, max_size) -> callbacks waiting for the decode
+        self.pending = {}
+        # (path, max_size) -> token of a pending decode that may be skipped
+        self.tokens = {}
+        self.results = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-decoder")
+        self._poll_job = None
+
+    def get(self, path, max_size=None):
+        """
+        Return the cached PhotoImage for a path and size, or None if it was not decoded yet.
+        """
+        key = (path, max_size)
+        photo = self.cache.get(key)
+        if photo is not None:
+            self.cache.move_to_end(key)
+        return photo
+
+    def request(self, path, callback=None, max_size=None, token=None):
+        """
+        Get an image asynchronously. The callback runs on the Tk thread with the PhotoImage,
+        or with None if the image could not be decoded. Cached images are passed right away.
+        :param path: The path of the image file.
+        :param callback: Callable taking the PhotoImage, or None to only warm the cache.
+        :param max_size: Optional (width, height) the image must fit in.
+        :param token: Optional CancelToken; the decode is skipped if it is cancelled before it starts.
+                      Only used to warm the cache, a request with a callback is never skipped.
+        """
+        key = (path, max_size)
+        photo = self.get(path, max_size)
+        if photo is not None:
+            if callback:
+                callback(photo)
+            return
+        callbacks = self.pending.get(key)
+        if callbacks is not None:
+            if callback:
+                callbacks.append(callback)
+                # Someone is waiting for this image now, it must be decoded after all
+                self.tokens.pop(key, None)
+            return
+        self.pending[key] = [callback] if callback else []
+        if token is not None and not callback:
+            self.tokens[key] = token
+        future = self.executor.submit(self._decode, key)
+        future.add_done_callback(lambda future: self.results.put((key, future)))
+        self._schedule_poll()
+
+    def _decode(self, key):
+        token = self.tokens.get(key)
+        if token is not None and token.cancelled:
+            return None
+        return decode_image(key[0], key[1], self.image_folder)
+
+    def is_pending(self, path, max_size=None):
+        return (path, max_size) in self.pending
+
+    def _schedule_poll(self):
+        if self._poll_job is None:
+            self._poll_job = self.root.after(POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        self._poll_job = None
+        while True:
+            try:
+                key, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            callbacks = self.pending.pop(key, [])
+            self.tokens.pop(key, None)
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                logger.error(f"Failed to decode image {key[0]}: {error}")
+                photo = None
+            elif future.result() is None:
+                # Skipped after its token was cancelled; a callback added in the meantime still gets its image
+                for callback in callbacks:
+                    self.request(key[0], callback, key[1])
+                continue
+            else:
+                photo = self._store(key, future.result())
+            for callback in callbacks:
+                callback(photo)
+        if self.pending:
+            self._schedule_poll()
+
+    def _store(self, key, img):
+        # PhotoImages must be created on the Tk thread
+        photo = ImageTk.PhotoImage(img, master=self.root)
+        size = img.width * img.height * 4
+        self.cache[key] = photo
+        self.cache_bytes += size
+        self.sizes[key] = size
+        while self.cache_bytes > self.max_bytes and len(self.cache) > 1:
+            old_key, _ = self.cache.popitem(last=False)
+            self.cache_bytes -= self.sizes.pop(old_key)
+        logger.debug(f"Cached image {key[0]}, cache holds {self.cache_bytes} bytes in {len(self.cache)} images.")
+        return photo
+
+    def close(self):
+        """
+        Stop the decoding threads, dropping queued decodes.
+        """
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class Prefetcher:
+    """
+    Warm the image cache ahead of time, one image at a time while the application is idle.
+
+    Each start() cancels the previous run. A run stops when it is cancelled, when its list of
+    paths is exhausted or when the images it decoded reach the memory budget.
+    """
+
+    def __init__(self, service, budget=DEFAULT_PREFETCH_BYTES):
+        """
+        :param service: The ImageService whose cache is warmed.
+        :param budget: Decoded bytes a single run may add to the cache.
+        """
+        self.service = service
+        self.budget = budget
+        self.token = CancelToken()
+        self._job = None
+
+    def start(self, paths, max_size=None):
+        """
+        Cancel the current run and start prefetching the given paths in order.
+        :param paths: Image paths, most likely to be needed first.
+        :param max_size: The size the images will be requested with.
+        """
+        self.cancel()
+        self.token = CancelToken()
+        run = {"paths": deque(paths), "max_size": max_size, "used": 0, "token": self.token}
+        self._job = self.service.root.after_idle(self._next, run)
+
+    def cancel(self):
+        self.token.cancel()
+        if self._job is not None:
+            self.service.root.after_cancel(self._job)
+            self._job = None
+
+    def _next(self, run, current=None):
+        self._job = None
+        if run["token"].cancelled:
+            return
+        service = self.service
+        if current is not None:
+            if service.is_pending(current, run["max_size"]):
+                self._job = service.root.after(POLL_INTERVAL, self._next, run, current)
+                return
+            run["used"] += service.sizes.get((current, run["max_size"]), 0)
+        if not run["paths"] or run["used"] >= self.budget:
+            logger.debug(f"Prefetch finished after {run['used']} bytes.")
+            return
+        path = run["paths"].popleft()
+        service.request(path, max_size=run["max_size"], token=run["token"])
+        # Wait for this decode before starting the next, leaving the workers free for real requests
+        self._job = service.root.after_idle(self._next, run, path)
@@ -1,64 +1,187 @@
 import os
 import json
 import logging
+import marshal
+from collections import ChainMap
 import tkinter as tk
 from tkinter import messagebox
-from data_handler import save_preferences
 
-# Set up logging
-logging.basicConfig(filename='app.log', level=logging.DEBUG, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 LANGUAGE_FOLDER = "languages"
+# Parsed catalogs are stored here in marshal form, so later starts skip the JSON parsing
+LANGUAGE_CACHE_FOLDER = os.path.join(LANGUAGE_FOLDER, ".cache")
+FALLBACK_LANGUAGE_FILE = "en.json"
+CACHE_VERSION = 1
 
-def load_language(language_file):
-    logging.info(f"Loading language from file: {language_file}")
+# Display names of the language codes; other catalogs name themselves with a "language_name" message
+LANGUAGE_NAMES = {
+    "en": "English",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "ja": "Japanese",
+    "zh": "Chinese",
+    "ko": "Korean",
+}
+
+# Parsed catalogs by language file: file -> (mtime_ns, catalog)
+_catalogs = {}
+# Languages found in the language folder, display name -> file
+_languages = None
+
+# Texts that follow the current language: (owner widget, message key, default text, setter)
+_text_bindings = []
+
+def read_catalog(language_file):
+    """
+    Read the messages of a language file, from memory or the marshal cache when the file did not change.
+    :param language_file: The file name within the language folder.
+    :return: The message dictionary, or None if the file does not exist.
+    """
     path = os.path.join(LANGUAGE_FOLDER, language_file)
-    if os.path.exists(path):
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _catalogs.get(language_file)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    catalog = None
+    cache_path = os.path.join(LANGUAGE_CACHE_FOLDER, os.path.splitext(language_file)[0] + ".marshal")
+    try:
+        with open(cache_path, 'rb') as file:
+            version, cached_mtime_ns, cached_catalog = marshal.load(file)
+        if version == CACHE_VERSION and cached_mtime_ns == mtime_ns:
+            catalog = cached_catalog
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    if catalog is None:
         with open(path, 'r', encoding='utf-8') as file:
-            logging.debug(f"Language file {language_file} loaded successfully")
-            return json.load(file)
-    logging.warning(f"Language file {language_file} not found")
-    return {}
+            catalog = json.load(file)
+        try:
+            os.makedirs(LANGUAGE_CACHE_FOLDER, exist_ok=True)
+            with open(cache_path, 'wb') as file:
+                marshal.dump((CACHE_VERSION, mtime_ns, catalog), file)
+        except OSError as e:
+            logger.warning(f"Could not cache language file {language_file}: {e}")
+        logger.debug(f"Language file {language_file} parsed")
+
+    _catalogs[language_file] = (mtime_ns, catalog)
+    return catalog
+
+def load_language(language_file):
+    """
+    Load a language. Messages missing from it fall back to English one key at a time.
+    :param language_file: The file name within the language folder.
+    :return: A mapping of message keys to texts.
+    """
+    logger.info(f"Loading language from file: {language_file}")
+    catalog = read_catalog(language_file)
+    if catalog is None:
+        logger.warning(f"Language file {language_file} not found")
+        catalog = {}
+    if language_file == FALLBACK_LANGUAGE_FILE:
+        return catalog
+    return ChainMap(catalog, read_catalog(FALLBACK_LANGUAGE_FILE) or {})
 
 def save_language(language_file, data):
-    logging.info(f"Saving language to file: {language_file}")
+    logger.info(f"Saving language to file: {language_file}")
     path = os.path.join(LANGUAGE_FOLDER, language_file)
     with open(path, 'w', encoding='utf-8') as file:
         json.dump(data, file, indent=4)
-    logging.debug(f"Language file {language_file} saved successfully")
+    _catalogs.pop(language_file, None)
+    logger.debug(f"Language file {language_file} saved successfully")
+
+def discover_languages():
+    """
+    Find the languages in the language folder. The folder is scanned once per run.
+    :return: A dictionary mapping display names to language files.
+    """
+    global _languages
+    if _languages is None:
+        _languages = {}
+        try:
+            # English first, as the fallback language
+            files = sorted((name for name in os.listdir(LANGUAGE_FOLDER) if name.endswith(".json")),
+                           key=lambda name: (name != FALLBACK_LANGUAGE_FILE, name))
+        except OSError as e:
+            logger.error(f"Failed to list languages in {LANGUAGE_FOLDER}: {e}")
+            files = []
+        for language_file in files:
+            code = os.path.splitext(language_file)[0]
+            name = LANGUAGE_NAMES.get(code)
+            if name is None:
+                name = (read_catalog(language_file) or {}).get("language_name", code)
+            _languages[name] = language_file
+    return _languages
 
 def get_supported_languages():
-    logging.info("Fetching list of supported languages")
-    return {
-        "English": "en.json",
-        "Spanish": "es.json",
-        "French": "fr.json",
-        "German": "de.json",
-        "Japanese": "ja.json",
-        "Chinese": "zh.json",
-        "Korean": "ko.json"
-    }
+    logger.info("Fetching list of supported languages")
+    return discover_languages()
+
+def bind_text(widget, language, key, default, setter=None):
+    """
+    Show a translated text on a widget and keep it in step with language changes.
+    :param widget: The widget the text belongs to; the binding is dropped once it is destroyed.
+    :param language: The current language dictionary.
+    :param key: The message key in the language files.
+    :param default: The text used when the language has no message for the key.
+    :param setter: Callable receiving the text, by default setting the widget's text option.
+    """
+    if setter is None:
+        setter = lambda text: widget.configure(text=text)
+    _text_bindings.append((widget, key, default, setter))
+    setter(language.get(key, default))
+
+def bind_menu_label(menu, language, key, default):
+    """
+    Translate the label of the entry last added to a menu.
+    """
+    index = menu.index("end")
+    bind_text(menu, language, key, default, lambda text: menu.entryconfigure(index, label=text))
+
+def bind_heading(treeview, column, language, key, default):
+    """
+    Translate the heading of a Treeview column.
+    """
+    bind_text(treeview, language, key, default, lambda text: treeview.heading(column, text=text))
+
+def relabel(language):
+    """
+    Set every bound text again from a new language, in place.
+    :param language: The new language dictionary.
+    :return: The number of texts updated.
+    """
+    count = 0
+    for binding in list(_text_bindings):
+        widget, key, default, setter = binding
+        try:
+            exists = widget.winfo_exists()
+        except tk.TclError:
+            exists = False
+        if not exists:
+            _text_bindings.remove(binding)
+            continue
+        setter(language.get(key, default))
+        count += 1
+    return count
 
 def change_language(app, language_file):
     """
-    Change the application's language and refresh the UI.
+    Change the application's language, updating the texts of the existing widgets in place.
     :param app: The main application instance.
     :param language_file: The file path of the selected language file.
     """
-    logging.info(f"Changing language to: {language_file}")
+    logger.info(f"Changing language to: {language_file}")
     app.language_file = language_file
     app.language = load_language(language_file)
     app.save_preferences()
-    logging.debug(f"Language changed to {language_file}, refreshing UI")
-    app.refresh_ui()
+    count = relabel(app.language)
+    logger.debug(f"Language changed to {language_file}, {count} texts updated")
 
 def apply_language(app, language_file):
-    logging.info(f"Applying language: {language_file}")
-    app.language_file = os.path.join(LANGUAGE_FOLDER, language_file)
-    app.language = load_language(app.language_file)
-    save_preferences({"language_file": app.language_file})
-    logging.debug(f"Language applied: {language_file}, refreshing UI")
-
-    # Notify the main app to refresh the UI
-    app.refresh_ui()
+    logger.info(f"Applying language: {language_file}")
+    change_language(app, language_file)
@@ -0,0 +1,72 @@
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FILE = 'app.log'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+# app.log is rotated past this size, keeping LOG_BACKUPS older files (app.log.1, app.log.2, ...)
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+# Level of each subsystem, by logger name ("" is the default for every other logger)
+LOG_LEVELS = {
+    "": "INFO",
+}
+# Overrides of the subsystem levels, e.g. DUNGEON_SOUP_LOG="theme_manager=DEBUG,search_index=DEBUG"
+LOG_LEVELS_ENV = 'DUNGEON_SOUP_LOG'
+
+_listener = None
+
+def parse_levels(text):
+    """
+    Parse "name=LEVEL,name=LEVEL" into a dictionary; a bare "LEVEL" sets the default level.
+    """
+    levels = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, level = part.rpartition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging(levels=None, log_file=LOG_FILE):
+    """
+    Route all logging through a queue to a writer thread, which appends to a rotating log file.
+    Logging calls on the Tk thread only put the record on the queue. Called once by each entry point
+    (never at import, so worker processes do not open the log file); only the first call configures anything.
+    :param levels: Optional dictionary of logger name to level, on top of LOG_LEVELS and the environment.
+    :param log_file: The path of the log file.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(records)]
+    configured = dict(LOG_LEVELS)
+    configured.update(parse_levels(os.environ.get(LOG_LEVELS_ENV, "")))
+    configured.update(levels or {})
+    for name, level in configured.items():
+        # An unknown level name must not keep the application from starting
+        if not isinstance(logging.getLevelName(level), int):
+            logging.getLogger(__name__).warning(f"Ignoring unknown log level {level!r} for {name or 'the root logger'}.")
+            continue
+        logging.getLogger(name or None).setLevel(level)
+
+def stop_logging():
+    """
+    Write the records still queued and stop the writer thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,135 @@
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from data_handler import prepare_snapshot, write_snapshot, append_journal_entries, journal_size, JOURNAL_COMPACT_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Seconds without changes before pending changes are written
+DEFAULT_SAVE_DELAY = 0.5
+
+class PersistenceService:
+    """
+    Write dungeon data to disk from a background thread.
+
+    Mutations are made inside mutate(), which collects journal entries describing the change.
+    The writer thread waits until no mutation happened for the quiet period and then appends the
+    whole burst to the journal at once. When the journal grows past compact_bytes, or a change
+    was made without journal entries, a full snapshot is written atomically instead.
+    flush() writes pending changes immediately and close() is called on exit.
+    """
+
+    def __init__(self, file_path, data, delay=DEFAULT_SAVE_DELAY, compact_bytes=JOURNAL_COMPACT_BYTES):
+        """
+        :param file_path: The path of the JSON file holding the dungeon data.
+        :param data: The dungeon data, mutated in place by the application.
+        :param delay: Quiet period in seconds before a burst of changes is written.
+        :param compact_bytes: Journal size in bytes past which it is compacted into a snapshot.
+        """
+        self.file_path = file_path
+        self.data = data
+        self.delay = delay
+        self.compact_bytes = compact_bytes
+        # Held while the data is mutated or serialized
+        self.lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._pending = []
+        self._snapshot_needed = False
+        self._last_change = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        logger.info(f"Persistence service started for {file_path} with a {delay}s quiet period.")
+
+    @contextmanager
+    def mutate(self):
+        """
+        Context manager wrapping a change to the data. It yields a list to which the caller appends
+        the journal entries describing the change; the change is saved once the quiet period passes.
+        """
+        entries = []
+        with self.lock:
+            yield entries
+        if entries:
+            self.record(entries)
+        else:
+            self.mark_dirty()
+
+    def record(self, entries):
+        """
+        Schedule journal entries to be appended after the quiet period.
+        """
+        with self._condition:
+            self._pending.extend(entries)
+            self._last_change = time.monotonic()
+            self._condition.notify()
+
+    def mark_dirty(self):
+        """
+        Schedule a full snapshot of the data after the quiet period.
+        """
+        with self._condition:
+            self._snapshot_needed = True
+            self._last_change = time.monotonic()
+            self._condition.notify()
+
+    def flush(self):
+        """
+        Write pending changes now, on the calling thread.
+        """
+        self._write()
+
+    def close(self):
+        """
+        Flush pending changes and stop the writer thread.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+        atexit.unregister(self.close)
+        logger.info(f"Persistence service for {self.file_path} closed.")
+
+    def _has_pending(self):
+        return bool(self._pending) or self._snapshot_needed
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._has_pending() and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                # Keep waiting while changes are still coming in
+                remaining = self._last_change + self.delay - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+            self._write()
+
+    def _write(self):
+        with self._write_lock:
+            with self._condition:
+                entries, self._pending = self._pending, []
+                snapshot, self._snapshot_needed = self._snapshot_needed, False
+            if not entries and not snapshot:
+                return
+            try:
+                if entries:
+                    append_journal_entries(self.file_path, entries)
+                if snapshot or journal_size(self.file_path) > self.compact_bytes:
+                    with self.lock:
+                        snapshot = prepare_snapshot(self.file_path, self.data)
+                    write_snapshot(self.file_path, snapshot)
+                logger.info(f"Dungeon data saved to {self.file_path} ({len(entries)} journal entries).")
+            except Exception as e:
+                logger.error(f"Failed to save dungeon data to {self.file_path}: {e}")
+                # Keep the changes for the next attempt; a snapshot covers them whether or not the append succeeded
+                self.mark_dirty()
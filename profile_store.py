@@ -0,0 +1,167 @@
+import logging
+from data_handler import load_profiles, save_profiles, PROFILES_FILE
+from filter_engine import iter_bits
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "Default"
+
+class ProfileStore:
+    """
+    Several characters tracked over one shared catalog.
+
+    The catalog (names, levels, unlock quests) is loaded once into the TrackerModel, whose data
+    always holds the state of the current profile. Every other profile is only a bitmap of its
+    unlocked duties, bit N standing for the Nth duty in catalog order as in the filter bitmaps,
+    plus the few duties that have tags. Switching profiles changes only the duties whose status
+    or tags differ, so the window re-renders only those rows.
+
+    On disk the profiles are stored by (expansion, type, name) key rather than position, so they
+    survive duties being added to the catalog.
+    """
+
+    def __init__(self, model, file_path=PROFILES_FILE):
+        """
+        :param model: The TrackerModel holding the catalog and the state of the current profile.
+        :param file_path: The path to the profiles file, or the SQLite database.
+        """
+        self.model = model
+        self.file_path = file_path
+        stored = load_profiles(file_path)
+        self.current = stored.get("current", DEFAULT_PROFILE)
+        # Profile name -> (unlocked bitmap, {position: tags})
+        self.profiles = {}
+        for name, profile in stored.get("profiles", {}).items():
+            if name != self.current:
+                self.profiles[name] = self.decode(profile)
+        # The data file is the source of truth for the current profile
+        self.profiles[self.current] = self.capture()
+        logger.info(f"Loaded {len(self.profiles)} profiles, current profile: {self.current}.")
+
+    def names(self):
+        return sorted(self.profiles)
+
+    def capture(self):
+        """
+        Take the state of the current profile from the model.
+        """
+        model = self.model
+        unlocked = model.filter_engine.bitmaps["Status"].get("Unlocked", 0)
+        tags = {}
+        for position, duty_id in enumerate(model.duty_ids):
+            duty_tags = model.duty(duty_id).get("Tags")
+            if duty_tags:
+                tags[position] = list(duty_tags)
+        return unlocked, tags
+
+    def decode(self, profile):
+        """
+        Turn a stored profile into a bitmap and tags by position, skipping duties no longer in the catalog.
+        """
+        registry = self.model.registry
+        unlocked = 0
+        tags = {}
+        for key in profile.get("unlocked", ()):
+            duty_id = registry.lookup(*key)
+            if duty_id is None:
+                logger.warning(f"Unknown duty {key} skipped in a profile.")
+                continue
+            unlocked |= 1 << registry.positions[duty_id]
+        for *key, duty_tags in profile.get("tags", ()):
+            duty_id = registry.lookup(*key)
+            if duty_id is not None:
+                tags[registry.positions[duty_id]] = list(duty_tags)
+        return unlocked, tags
+
+    def encode(self, profile):
+        unlocked, tags = profile
+        registry, duty_ids = self.model.registry, self.model.duty_ids
+        return {
+            "unlocked": [list(registry.key(duty_ids[position])) for position in iter_bits(unlocked)],
+            "tags": [[*registry.key(duty_ids[position]), duty_tags] for position, duty_tags in sorted(tags.items())],
+        }
+
+    def save(self):
+        self.profiles[self.current] = self.capture()
+        # The data file must hold the current profile's state before the profiles file says which profile is current
+        if self.model.persistence is not None:
+            self.model.persistence.flush()
+        save_profiles({"current": self.current,
+                       "profiles": {name: self.encode(profile) for name, profile in self.profiles.items()}},
+                      self.file_path)
+
+    def create(self, name, save=True):
+        """
+        Add a profile with every duty locked.
+        :param name: The name of the new profile.
+        :param save: Whether to save the profiles right away; pass False to save them later with other changes.
+        :return: False if a profile with this name already exists.
+        """
+        if name in self.profiles:
+            return False
+        self.profiles[name] = (0, {})
+        if save:
+            self.save()
+        logger.info(f"Profile {name} created.")
+        return True
+
+    def delete(self, name):
+        """
+        Remove a profile other than the current one.
+        """
+        if name == self.current or name not in self.profiles:
+            return False
+        del self.profiles[name]
+        self.save()
+        logger.info(f"Profile {name} deleted.")
+        return True
+
+    def switch(self, name):
+        """
+        Make another profile current, changing only the duties whose state differs between the two.
+        :return: The number of duties whose status changed.
+        """
+        if name == self.current or name not in self.profiles:
+            return 0
+        model = self.model
+        old_unlocked, old_tags = self.profiles[self.current] = self.capture()
+        new_unlocked, new_tags = self.profiles[name]
+
+        duty_ids = model.duty_ids
+        unlocked = model.set_status([duty_ids[position] for position in iter_bits(new_unlocked & ~old_unlocked)], "Unlocked")
+        locked = model.set_status([duty_ids[position] for position in iter_bits(old_unlocked & ~new_unlocked)], "Locked")
+        for position in old_tags.keys() | new_tags.keys():
+            if old_tags.get(position) != new_tags.get(position):
+                model.set_tags(duty_ids[position], new_tags.get(position, []))
+
+        self.current = name
+        self.save()
+        # Rows that changed status may have to appear or disappear when filtering by status
+        if model.selected_filters.get("Status") and (unlocked or locked):
+            model.refresh()
+        logger.info(f"Switched to profile {name}, {len(unlocked) + len(locked)} duties changed status.")
+        return len(unlocked) + len(locked)
+
+    def status(self, name, duty_id):
+        """
+        Return the status of a duty in any profile.
+        """
+        if name == self.current:
+            return self.model.status(duty_id)
+        unlocked = self.profiles[name][0] >> self.model.registry.positions[duty_id] & 1
+        return "Unlocked" if unlocked else "Locked"
+
+    def set_status(self, name, duty_ids, new_status):
+        """
+        Change the status of duties in any profile, without switching to it. Call save() afterwards.
+        :return: The number of duties whose status changed.
+        """
+        if name == self.current:
+            return len(self.model.set_status(duty_ids, new_status))
+        unlocked, tags = self.profiles[name]
+        mask = 0
+        for duty_id in duty_ids:
+            mask |= 1 << self.model.registry.positions[duty_id]
+        updated = unlocked | mask if new_status == "Unlocked" else unlocked & ~mask
+        self.profiles[name] = (updated, tags)
+        return bin(updated ^ unlocked).count("1")
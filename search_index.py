@@ -0,0 +1,145 @@
+import logging
+import re
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Duty fields that are searchable: the name, as the tracker has always searched
+SEARCH_FIELDS = ("Name",)
+GRAM_SIZE = 3
+
+@lru_cache(maxsize=256)
+def compile_wildcard(query):
+    """
+    Compile a search query containing '*' wildcards into a regular expression, once per query.
+    :param query: The lowercased search query.
+    :return: A compiled pattern where '*' matches any run of characters within one field.
+    """
+    return re.compile(".*".join(re.escape(part) for part in query.split("*")))
+
+def quoted_parts(query):
+    """
+    Split a query containing quotes into the phrases that may each match on their own.
+    Blank parts, such as the space between '"the" "of"', are not phrases. The search used to keep
+    them, which made such a query match every name containing a space.
+    """
+    return [part for part in query.split('"') if part.strip()]
+
+def match_text(text, query):
+    """
+    Check whether a lowercased text matches a search query.
+    Supports '*' wildcards, "quoted" alternatives and plain substring matching.
+    :param text: The lowercased text to search in.
+    :param query: The lowercased search query.
+    :return: True if the text matches.
+    """
+    if query == "":
+        return True
+    if "*" in query:
+        return compile_wildcard(query).search(text) is not None
+    if '"' in query:
+        return any(part in text for part in quoted_parts(query))
+    return query in text
+
+def grams(text):
+    """
+    Return the set of character trigrams in a text.
+    """
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+class SearchIndex:
+    """
+    Inverted index over the searchable fields of every duty.
+
+    Documents are identified by their position in the catalog order. Each document is indexed
+    by its whitespace separated tokens and its character trigrams; a query is answered by
+    intersecting the smallest posting lists and verifying the few remaining candidates.
+    Names do not change while the tracker runs, so the index is built once when the data is loaded.
+    """
+
+    def __init__(self, duties=()):
+        """
+        :param duties: Optional iterable of duty dictionaries, indexed in order from position 0.
+        """
+        self.texts = []
+        self.grams = defaultdict(lambda: array('I'))
+        self.tokens = defaultdict(lambda: array('I'))
+        for duty in duties:
+            self.add(duty)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def document_text(self, duty):
+        # Fields are separated by newlines so that no substring or wildcard spans two fields
+        return "\n".join(str(duty.get(field, "")) for field in SEARCH_FIELDS).lower()
+
+    def add(self, duty):
+        """
+        Index a new duty at the next free position.
+        :param duty: The duty dictionary.
+        :return: The position assigned to the duty.
+        """
+        position = len(self.texts)
+        text = self.document_text(duty)
+        self.texts.append(text)
+        for gram in grams(text):
+            self.grams[gram].append(position)
+        for token in set(text.split()):
+            self.tokens[token].append(position)
+        return position
+
+    def search(self, query):
+        """
+        Find every duty matching a search query.
+        :param query: The search query, using the same syntax as match_text.
+        :return: A set of matching positions, or None if the query matches everything.
+        """
+        query = query.lower()
+        if query == "":
+            return None
+        if "*" in query:
+            pattern = compile_wildcard(query)
+            candidates = self.candidates(query.split("*"))
+            return {position for position in candidates if pattern.search(self.texts[position])}
+        if '"' in query:
+            matches = set()
+            for part in quoted_parts(query):
+                matches |= self.search_substring(part)
+            return matches
+        return self.search_substring(query)
+
+    def search_substring(self, fragment):
+        candidates = self.candidates([fragment])
+        return {position for position in candidates if fragment in self.texts[position]}
+
+    def candidates(self, fragments):
+        """
+        Collect the positions that may contain all of the given literal fragments.
+        """
+        postings = []
+        for fragment in fragments:
+            for gram in grams(fragment):
+                postings.append(self.grams.get(gram, ()))
+            # Words surrounded by spaces inside a fragment must appear as whole tokens
+            words = fragment.split(" ")
+            for word in words[1:-1]:
+                if word:
+                    postings.append(self.tokens.get(word, ()))
+        if not postings:
+            # Fragments shorter than a trigram cannot be narrowed down, every document is a candidate
+            return range(len(self.texts))
+
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            # Stop intersecting once the remaining lists are much larger than the candidate set,
+            # verifying a handful of candidates is cheaper than walking a long posting list
+            if not candidates or len(posting) > 8 * len(candidates):
+                break
+            candidates.intersection_update(posting)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Search narrowed to {len(candidates)} candidates.")
+        return candidates
@@ -0,0 +1,287 @@
+import json
+import logging
+import sqlite3
+import sys
+from filter_engine import LEVEL_RANGES
+from search_index import quoted_parts
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS duties (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    expansion TEXT NOT NULL,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    unlock TEXT NOT NULL,
+    quest_type TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'Locked',
+    tags TEXT NOT NULL DEFAULT '[]',
+    UNIQUE (expansion, type, name)
+);
+CREATE INDEX IF NOT EXISTS idx_duties_position ON duties (position);
+CREATE INDEX IF NOT EXISTS idx_duties_expansion ON duties (expansion);
+CREATE INDEX IF NOT EXISTS idx_duties_type ON duties (type);
+CREATE INDEX IF NOT EXISTS idx_duties_level ON duties (level);
+CREATE INDEX IF NOT EXISTS idx_duties_status ON duties (status);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    time TEXT NOT NULL,
+    op TEXT NOT NULL,
+    expansion TEXT,
+    type TEXT,
+    name TEXT,
+    value TEXT
+);
+"""
+
+def is_sqlite_path(file_path):
+    """
+    Check whether a storage path refers to an SQLite database rather than a JSON file.
+    """
+    return str(file_path).lower().endswith(SQLITE_EXTENSIONS)
+
+def connect(db_path):
+    """
+    Open an SQLite database, creating the schema if needed.
+    :param db_path: The path to the database file.
+    :return: An sqlite3 connection.
+    """
+    connection = sqlite3.connect(db_path)
+    connection.executescript(SCHEMA)
+    # SQLite's lower() only folds ASCII, searches must lowercase names the way the search index does
+    connection.create_function("py_lower", 1, str.lower, deterministic=True)
+    return connection
+
+def load_dungeon_data(db_path):
+    """
+    Load dungeon data from an SQLite database, in the same nested layout as duties.json.
+    :param db_path: The path to the database file.
+    :return: A list of expansions, each with its duty types and duties.
+    """
+    connection = connect(db_path)
+    try:
+        rows = connection.execute(
+            "SELECT expansion, type, name, level, unlock, quest_type, status, tags FROM duties ORDER BY position").fetchall()
+    finally:
+        connection.close()
+
+    data = []
+    expansions = {}
+    duty_types = {}
+    for expansion, duty_type, name, level, unlock, quest_type, status, tags in rows:
+        if expansion not in expansions:
+            expansions[expansion] = {"expansion": expansion, "duties": []}
+            data.append(expansions[expansion])
+        if (expansion, duty_type) not in duty_types:
+            duty_types[(expansion, duty_type)] = {"type": duty_type, "duties": []}
+            expansions[expansion]["duties"].append(duty_types[(expansion, duty_type)])
+        duty_types[(expansion, duty_type)]["duties"].append({
+            "Name": name,
+            "Level": level,
+            "Unlock": unlock,
+            "Quest Type": quest_type,
+            "Status": status,
+            "Tags": json.loads(tags),
+        })
+    logger.info(f"Loaded {len(rows)} duties from {db_path}.")
+    return data
+
+def duty_rows(data):
+    """
+    Flatten dungeon data into rows for the duties table, in catalog order.
+    """
+    rows = []
+    for expansion in data:
+        for duty_type in expansion["duties"]:
+            for duty in duty_type["duties"]:
+                rows.append((len(rows), expansion["expansion"], duty_type["type"], duty["Name"], int(duty["Level"]),
+                             duty["Unlock"], duty["Quest Type"], duty["Status"], json.dumps(duty.get("Tags", []))))
+    return rows
+
+def save_duty_rows(db_path, rows):
+    """
+    Bring the duties table in line with the given rows in a single transaction, writing only the
+    rows that differ from the stored ones and deleting the duties that are gone.
+    :param db_path: The path to the database file.
+    :param rows: Rows as produced by duty_rows.
+    """
+    connection = connect(db_path)
+    try:
+        with connection:
+            stored = {row[1:4]: row for row in connection.execute(
+                "SELECT position, expansion, type, name, level, unlock, quest_type, status, tags FROM duties")}
+            changed = [row for row in rows if stored.pop(row[1:4], None) != row]
+            connection.executemany("DELETE FROM duties WHERE expansion = ? AND type = ? AND name = ?", list(stored))
+            connection.executemany(
+                "INSERT INTO duties (position, expansion, type, name, level, unlock, quest_type, status, tags) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (expansion, type, name) DO UPDATE SET position = excluded.position, level = excluded.level, "
+                "unlock = excluded.unlock, quest_type = excluded.quest_type, status = excluded.status, tags = excluded.tags",
+                changed)
+    finally:
+        connection.close()
+    logger.info(f"Saved {len(changed)} changed and removed {len(stored)} of {len(rows)} duties in {db_path}.")
+
+def save_dungeon_data(db_path, data):
+    save_duty_rows(db_path, duty_rows(data))
+
+def apply_journal_entries(db_path, entries):
+    """
+    Apply journal entries as single-row updates and record them in the history table.
+    :param db_path: The path to the database file.
+    :param entries: Journal entries as built by data_handler.journal_entry.
+    """
+    connection = connect(db_path)
+    try:
+        with connection:
+            for entry in entries:
+                key = (entry.get("expansion"), entry.get("type"), entry.get("name"))
+                if entry["op"] == "reset":
+                    connection.execute("UPDATE duties SET status = 'Locked', tags = '[]'")
+                elif entry["op"] == "status":
+                    connection.execute("UPDATE duties SET status = ? WHERE expansion = ? AND type = ? AND name = ?",
+                                       (entry["value"], *key))
+                elif entry["op"] == "tags":
+                    connection.execute("UPDATE duties SET tags = ? WHERE expansion = ? AND type = ? AND name = ?",
+                                       (json.dumps(entry["value"]), *key))
+                value = entry.get("value")
+                connection.execute("INSERT INTO history (time, op, expansion, type, name, value) VALUES (?, ?, ?, ?, ?, ?)",
+                                   (entry["time"], entry["op"], *key, None if value is None else json.dumps(value)))
+    finally:
+        connection.close()
+    logger.debug(f"Applied {len(entries)} journal entries to {db_path}.")
+
+def load_setting(db_path, name):
+    """
+    Load a JSON setting (such as "preferences" or "themes") from the settings table.
+    :return: The stored value, or an empty dictionary if it is not set.
+    """
+    connection = connect(db_path)
+    try:
+        row = connection.execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()
+    finally:
+        connection.close()
+    return json.loads(row[0]) if row else {}
+
+def save_setting(db_path, name, value):
+    """
+    Store a JSON setting in the settings table.
+    """
+    connection = connect(db_path)
+    try:
+        with connection:
+            connection.execute("INSERT INTO settings (name, value) VALUES (?, ?) "
+                               "ON CONFLICT (name) DO UPDATE SET value = excluded.value", (name, json.dumps(value)))
+    finally:
+        connection.close()
+
+def level_bounds(label):
+    """
+    Return the inclusive (low, high) levels that belong to a level range label.
+    A level on the boundary of two ranges belongs to the first one, as in filter_engine.get_level_range.
+    """
+    start, end = map(int, label.split('-'))
+    for earlier in LEVEL_RANGES[:LEVEL_RANGES.index(label)]:
+        earlier_start, earlier_end = map(int, earlier.split('-'))
+        if earlier_start <= start <= earlier_end:
+            start = earlier_end + 1
+    return start, end
+
+def like_pattern(text):
+    """
+    Escape a literal text for use in a LIKE pattern with '\\' as the escape character.
+    """
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def query_positions(db_path, selected_filters=None, search_query=""):
+    """
+    Run a filter combination and a name search inside SQLite, with the semantics of
+    FilterEngine.match and SearchIndex.search.
+    :param db_path: The path to the database file.
+    :param selected_filters: Dict mapping a filter category to the set of selected values, as in the tracker.
+    :param search_query: A search query using the syntax of search_index.match_text.
+    :return: The catalog positions of the matching duties, in catalog order.
+    """
+    columns = {"Expansion": "expansion", "Quest Type": "quest_type", "Duty Type": "type", "Status": "status"}
+    clauses = []
+    params = []
+    for category, values in (selected_filters or {}).items():
+        if not values:
+            continue
+        if category == "Level":
+            ranges = [level_bounds(label) for label in values if label in LEVEL_RANGES]
+            clauses.append("(" + " OR ".join("level BETWEEN ? AND ?" for _ in ranges) + ")" if ranges else "0")
+            for bounds in ranges:
+                params.extend(bounds)
+        elif category in columns:
+            clauses.append(f"{columns[category]} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+
+    query = search_query.lower()
+    if "*" in query:
+        clauses.append("py_lower(name) LIKE ? ESCAPE '\\'")
+        params.append("%" + "%".join(like_pattern(part) for part in query.split("*")) + "%")
+    elif '"' in query:
+        parts = quoted_parts(query)
+        clauses.append("(" + " OR ".join("instr(py_lower(name), ?) > 0" for _ in parts) + ")" if parts else "0")
+        params.extend(parts)
+    elif query:
+        clauses.append("instr(py_lower(name), ?) > 0")
+        params.append(query)
+
+    sql = "SELECT position FROM duties"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY position"
+    connection = connect(db_path)
+    try:
+        return [position for (position,) in connection.execute(sql, params)]
+    finally:
+        connection.close()
+
+def migrate_json_to_sqlite(json_path, db_path, preferences_path='preferences.json', themes_path='themes.json',
+                           profiles_path='profiles.json'):
+    """
+    Copy duties.json, and the preferences, themes and profiles files if they exist, into an SQLite database.
+    :param json_path: The path to the JSON file containing dungeon data.
+    :param db_path: The path of the database to create or overwrite.
+    :param preferences_path: The path to the JSON preferences file.
+    :param themes_path: The path to the JSON themes file.
+    :param profiles_path: The path to the JSON character profiles file.
+    :return: The number of duties migrated.
+    """
+    # Imported here, data_handler imports this module
+    from data_handler import load_dungeon_data as load_json_data, load_themes, load_preferences, load_profiles
+    data = load_json_data(json_path)
+    rows = duty_rows(data)
+    save_duty_rows(db_path, rows)
+    preferences = load_preferences(preferences_path)
+    if preferences:
+        save_setting(db_path, "preferences", preferences)
+    themes = load_themes(themes_path)
+    if themes:
+        save_setting(db_path, "themes", themes)
+    # Profiles are read from the database once the data lives there, so they have to move with it
+    profiles = load_profiles(profiles_path)
+    if profiles:
+        save_setting(db_path, "profiles", profiles)
+    logger.info(f"Migrated {len(rows)} duties from {json_path} to {db_path}.")
+    return len(rows)
+
+if __name__ == "__main__":
+    configure_logging()
+    if len(sys.argv) != 3:
+        print("Usage: python sqlite_store.py <duties.json> <duties.db>")
+        sys.exit(1)
+    count = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f"Migrated {count} duties to {sys.argv[2]}.")
@@ -0,0 +1,34 @@
+class MemoryTreeview:
+    """
+    The part of the ttk.Treeview API used by the tracker, kept in dictionaries, so the tree
+    operations can be tested and timed without a display.
+    """
+
+    def __init__(self):
+        self.items = {"": {"children": []}}
+        self.parents = {}
+
+    def exists(self, item):
+        return item in self.items
+
+    def insert(self, parent, index, iid=None, **options):
+        self.items[iid] = dict(options, children=[])
+        self.items[parent]["children"].insert(index, iid)
+        self.parents[iid] = parent
+        return iid
+
+    def detach(self, *items):
+        for item in items:
+            self.items[self.parents[item]]["children"].remove(item)
+
+    def move(self, item, parent, index):
+        self.items[parent]["children"].insert(index, item)
+        self.parents[item] = parent
+
+    def get_children(self, item=""):
+        return tuple(self.items[item]["children"])
+
+    def item(self, item, option=None, **options):
+        if option is not None:
+            return self.items[item].get(option, ())
+        self.items[item].update(options)
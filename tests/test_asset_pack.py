@@ -0,0 +1,33 @@
+import os
+import asset_pack
+from asset_pack import build_pack, find_pack, open_asset
+from image_manifest import ImageManifest
+
+
+def write_image(image_folder, relative_path, content):
+    path = os.path.join(image_folder, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def test_pack_built_after_a_miss_is_picked_up(tmp_path):
+    image_folder = str(tmp_path / "QuestInfo")
+    path = write_image(image_folder, os.path.join("Endwalker", "Dungeons", "Keeper.jpg"), b"loose")
+    try:
+        assert find_pack(image_folder) is None
+        manifest = ImageManifest.build(image_folder)
+        assert manifest.is_current()
+
+        build_pack(image_folder)
+        write_image(image_folder, os.path.join("Endwalker", "Dungeons", "Keeper.jpg"), b"stale")
+
+        assert find_pack(image_folder) is not None
+        assert not manifest.is_current()
+        with open_asset(path) as f:
+            assert f.read() == b"loose"
+    finally:
+        pack = asset_pack._packs.pop(image_folder, None)
+        if pack is not None:
+            pack.close()
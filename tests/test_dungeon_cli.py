@@ -0,0 +1,17 @@
+import profile_store
+from benchmarks.generate import write_catalog
+from data_handler import load_profiles
+from dungeon_cli import main
+
+
+def test_new_profile_is_saved_once_with_its_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_catalog("duties.json", 300)
+    saves = []
+    save_profiles = profile_store.save_profiles
+    monkeypatch.setattr(profile_store, "save_profiles", lambda *args: (saves.append(args), save_profiles(*args)))
+
+    assert main(["unlock", "--name", "crystal", "--profile", "Alt"]) == 0
+    assert len(saves) == 1
+    stored = load_profiles()
+    assert stored["current"] == "Default" and stored["profiles"]["Alt"]["unlocked"]
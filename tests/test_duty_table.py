@@ -0,0 +1,83 @@
+import copy
+import json
+import random
+from benchmarks.generate import generate_catalog
+from data_handler import load_dungeon_data, save_dungeon_data, serialize_dungeon_data
+from duty_table import DutyRecord, duty_table, to_columnar
+
+
+def all_duties(data):
+    return [duty for expansion in data for duty_type in expansion["duties"] for duty in duty_type["duties"]]
+
+
+def tagged_catalog(size, seed=0):
+    data = generate_catalog(size, seed)
+    rng = random.Random(seed)
+    for duty in rng.sample(all_duties(data), size // 10):
+        duty["Tags"] = rng.sample(["Favorite", "Farm", "Mount", "Ünicode"], rng.randint(1, 2))
+    return data
+
+
+def test_columnar_data_serializes_like_the_dictionaries():
+    data = tagged_catalog(2000)
+    original = copy.deepcopy(data)
+    to_columnar(data)
+    assert duty_table(data) is not None
+    assert all(isinstance(duty, DutyRecord) for duty in all_duties(data))
+    assert serialize_dungeon_data(data) == serialize_dungeon_data(original)
+
+
+def test_records_read_and_write_like_dictionaries():
+    data = tagged_catalog(1000, seed=1)
+    expected = all_duties(copy.deepcopy(data))
+    to_columnar(data)
+    records = all_duties(data)
+    rng = random.Random(1)
+    for _ in range(500):
+        position = rng.randrange(len(records))
+        key, value = rng.choice([
+            ("Status", rng.choice(["Locked", "Unlocked"])),
+            ("Tags", rng.sample(["Favorite", "Farm", "Mount"], rng.randint(0, 2))),
+            ("Name", f"Renamed {rng.randrange(50)}"),
+            ("Level", rng.randint(1, 100)),
+        ])
+        records[position][key] = value
+        expected[position][key] = value
+    assert [record.to_dict() for record in records] == expected
+    assert [dict(record) for record in records] == expected
+
+
+def test_save_and_load_round_trip(tmp_path):
+    data_file = str(tmp_path / "duties.json")
+    data = tagged_catalog(1500, seed=2)
+    original = copy.deepcopy(data)
+    to_columnar(data)
+    save_dungeon_data(data_file, data)
+    with open(data_file, encoding='utf-8') as f:
+        assert json.load(f) == original
+    loaded = load_dungeon_data(data_file)
+    assert duty_table(loaded) is not None
+    assert serialize_dungeon_data(loaded) == serialize_dungeon_data(original)
+
+
+def test_unexpected_duties_stay_dictionaries():
+    data = generate_catalog(100)
+    odd = all_duties(data)[5]
+    odd["Extra"] = True
+    original = copy.deepcopy(data)
+    to_columnar(data)
+    assert all_duties(data)[5] is odd
+    assert duty_table(data) is None
+    assert serialize_dungeon_data(data) == serialize_dungeon_data(original)
+
+
+def test_too_many_distinct_values_keep_the_dictionaries(tmp_path):
+    data_file = tmp_path / "duties.json"
+    data = generate_catalog(400)
+    for index, duty in enumerate(all_duties(data)):
+        duty["Quest Type"] = f"Quest Type {index}"
+    data_file.write_text(json.dumps(data), encoding='utf-8')
+    loaded = load_dungeon_data(str(data_file))
+    assert duty_table(loaded) is None
+    assert all(type(duty) is dict for duty in all_duties(loaded))
+    assert serialize_dungeon_data(loaded) == serialize_dungeon_data(data)
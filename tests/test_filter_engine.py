@@ -0,0 +1,77 @@
+import random
+from benchmarks.generate import generate_catalog
+from duty_table import to_columnar
+from filter_engine import FilterEngine, LEVEL_RANGES, get_level_range, iter_bits
+
+
+def scan(data, selected_filters):
+    # The per-row checks update_tree made before the bitmaps
+    positions = []
+    position = 0
+    for expansion in data:
+        for duty_type in expansion["duties"]:
+            for duty in duty_type["duties"]:
+                values = {
+                    "Expansion": expansion["expansion"],
+                    "Level": get_level_range(duty["Level"]),
+                    "Quest Type": duty["Quest Type"],
+                    "Duty Type": duty_type["type"],
+                    "Status": duty["Status"],
+                }
+                if all(not selected or values[category] in selected for category, selected in selected_filters.items()):
+                    positions.append(position)
+                position += 1
+    return positions
+
+
+def random_filters(data, rng):
+    choices = {
+        "Expansion": [expansion["expansion"] for expansion in data] + ["Unknown"],
+        "Level": LEVEL_RANGES,
+        "Quest Type": ["Main Quest", "Feature Quest"],
+        "Duty Type": ["Dungeons", "Trials", "Raids", "Guildhests"],
+        "Status": ["Locked", "Unlocked"],
+    }
+    return {category: set(rng.sample(values, rng.randint(0, min(3, len(values))))) if rng.random() < 0.6 else set()
+            for category, values in choices.items()}
+
+
+def set_random_statuses(data, engine, rng, count):
+    duties = [duty for expansion in data for duty_type in expansion["duties"] for duty in duty_type["duties"]]
+    for position in rng.sample(range(len(duties)), count):
+        status = rng.choice(["Locked", "Unlocked"])
+        duties[position]["Status"] = status
+        engine.set_status(position, status)
+
+
+def check_random_combinations(data, seed):
+    engine = FilterEngine(data)
+    rng = random.Random(seed)
+    for step in range(200):
+        selected_filters = random_filters(data, rng)
+        assert list(iter_bits(engine.match(selected_filters))) == scan(data, selected_filters), selected_filters
+        if step % 20 == 0:
+            set_random_statuses(data, engine, rng, 50)
+
+
+def test_dictionaries_match_linear_scan():
+    check_random_combinations(generate_catalog(2000), seed=1)
+
+
+def test_duty_table_matches_linear_scan():
+    data = generate_catalog(2000)
+    to_columnar(data)
+    check_random_combinations(data, seed=2)
+
+
+def test_reset_status_matches_linear_scan():
+    data = generate_catalog(500)
+    to_columnar(data)
+    engine = FilterEngine(data)
+    for expansion in data:
+        for duty_type in expansion["duties"]:
+            for duty in duty_type["duties"]:
+                duty["Status"] = "Locked"
+    engine.reset_status("Locked")
+    for status in ("Locked", "Unlocked"):
+        assert list(iter_bits(engine.match({"Status": {status}}))) == scan(data, {"Status": {status}})
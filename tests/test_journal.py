@@ -0,0 +1,59 @@
+import json
+from benchmarks.generate import write_catalog
+from data_handler import load_dungeon_data, append_journal_entries, journal_entry, journal_path, get_duty_registry
+
+
+def unlock_entry(data, position):
+    registry = get_duty_registry(data)
+    return journal_entry("status", registry.key(registry.ids[position]), "Unlocked")
+
+
+def status(data, position):
+    registry = get_duty_registry(data)
+    return registry.get(registry.ids[position])["Status"]
+
+
+def write_locked_catalog(data_file, size):
+    data = write_catalog(data_file, size)
+    for expansion in data:
+        for duty_type in expansion["duties"]:
+            for duty in duty_type["duties"]:
+                duty["Status"] = "Locked"
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def tear_journal(data_file):
+    # What a crash in the middle of an append leaves behind
+    with open(journal_path(data_file), 'a', encoding='utf-8') as f:
+        f.write('{"time": "2024-01-01T00:00:00+00:00", "op": "sta')
+
+
+def test_replay_drops_torn_tail_before_next_append(tmp_path):
+    data_file = str(tmp_path / "duties.json")
+    write_locked_catalog(data_file, 200)
+    data = load_dungeon_data(data_file)
+    append_journal_entries(data_file, [unlock_entry(data, 10)])
+    tear_journal(data_file)
+
+    data = load_dungeon_data(data_file)
+    assert status(data, 10) == "Unlocked"
+    with open(journal_path(data_file), 'rb') as f:
+        assert f.read().endswith(b"\n")
+
+    append_journal_entries(data_file, [unlock_entry(data, 100)])
+    data = load_dungeon_data(data_file)
+    assert status(data, 10) == "Unlocked"
+    assert status(data, 100) == "Unlocked"
+
+
+def test_append_after_torn_tail_starts_a_new_line(tmp_path):
+    data_file = str(tmp_path / "duties.json")
+    write_locked_catalog(data_file, 200)
+    data = load_dungeon_data(data_file)
+    tear_journal(data_file)
+
+    # Appended without a load in between, so the torn line is still in the journal
+    append_journal_entries(data_file, [unlock_entry(data, 100)])
+    data = load_dungeon_data(data_file)
+    assert status(data, 100) == "Unlocked"
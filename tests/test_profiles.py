@@ -0,0 +1,72 @@
+import random
+from benchmarks.generate import write_catalog
+from data_handler import load_dungeon_data, load_profiles
+from persistence import PersistenceService
+from profile_store import ProfileStore
+from tracker_model import TrackerModel
+
+
+def test_switch_writes_duties_before_profiles(tmp_path):
+    data_file = str(tmp_path / "duties.json")
+    profiles_file = str(tmp_path / "profiles.json")
+    write_catalog(data_file, 300)
+    data = load_dungeon_data(data_file)
+    # A quiet period longer than the test, so nothing is written unless it is flushed
+    persistence = PersistenceService(data_file, data, delay=60)
+    try:
+        model = TrackerModel(data, persistence)
+        profiles = ProfileStore(model, profiles_file)
+        profiles.create("Alt")
+        assert profiles.switch("Alt") > 0
+
+        # What a crash right after the switch would leave on disk
+        assert load_profiles(profiles_file)["current"] == "Alt"
+        on_disk = load_dungeon_data(data_file)
+        assert all(duty["Status"] == "Locked" for expansion in on_disk
+                   for duty_type in expansion["duties"] for duty in duty_type["duties"])
+    finally:
+        persistence.close()
+
+
+def statuses(model):
+    return [model.status(duty_id) for duty_id in model.duty_ids]
+
+
+def tags(model):
+    return [list(model.duty(duty_id)["Tags"]) for duty_id in model.duty_ids]
+
+
+def test_profiles_round_trip_through_bitmaps(tmp_path):
+    data_file = str(tmp_path / "duties.json")
+    profiles_file = str(tmp_path / "profiles.json")
+    write_catalog(data_file, 500)
+    model = TrackerModel(load_dungeon_data(data_file))
+    profiles = ProfileStore(model, profiles_file)
+    rng = random.Random(4)
+    model.set_tags(model.duty_ids[3], ["Favorite"])
+    default_state = (statuses(model), tags(model))
+
+    profiles.create("Alt")
+    profiles.switch("Alt")
+    assert set(statuses(model)) == {"Locked"} and not any(tags(model))
+    unlocked = rng.sample(model.duty_ids, 120)
+    model.set_status(unlocked, "Unlocked")
+    model.set_tags(model.duty_ids[7], ["Mount", "Farm"])
+    alt_state = (statuses(model), tags(model))
+
+    # Changing a profile that is not current must only change its bitmap
+    profiles.set_status("Default", model.duty_ids[:50], "Unlocked")
+    assert (statuses(model), tags(model)) == alt_state
+    default_state[0][:50] = ["Unlocked"] * 50
+    assert [profiles.status("Default", duty_id) for duty_id in model.duty_ids] == default_state[0]
+    profiles.save()
+
+    for name, state in (("Default", default_state), ("Alt", alt_state), ("Default", default_state)):
+        profiles.switch(name)
+        assert (statuses(model), tags(model)) == state
+
+    # The profiles file and the bitmaps it decodes to hold the same state
+    reloaded = ProfileStore(model, profiles_file)
+    assert reloaded.current == "Default"
+    assert reloaded.profiles == profiles.profiles
+    assert reloaded.decode(reloaded.encode(reloaded.profiles["Alt"])) == reloaded.profiles["Alt"]
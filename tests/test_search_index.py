@@ -0,0 +1,53 @@
+import random
+from benchmarks.generate import generate_catalog
+from search_index import SearchIndex, match_text
+
+QUERIES = ["", "the", "crystal", "keeper 1", "tower vault", "the *keep", "*of*", "e", "zz", "1",
+           '"tower" "vault"', '"abyss"', "temple 4", "(", "a.b", "ruins*"]
+
+
+def catalog_duties(size, seed=0):
+    return [duty for expansion in generate_catalog(size, seed) for duty_type in expansion["duties"]
+            for duty in duty_type["duties"]]
+
+
+def scan(duties, query):
+    # The search the tracker did before the index: every duty name checked in turn
+    query = query.lower()
+    return {position for position, duty in enumerate(duties) if match_text(duty["Name"].lower(), query)}
+
+
+def random_queries(duties, rng, count):
+    queries = []
+    for _ in range(count):
+        name = rng.choice(duties)["Name"].lower()
+        start = rng.randrange(len(name))
+        fragment = name[start:start + rng.randint(1, 8)]
+        kind = rng.random()
+        if kind < 0.2 and len(fragment) > 2:
+            cut = rng.randrange(1, len(fragment))
+            fragment = fragment[:cut] + "*" + fragment[cut:]
+        elif kind < 0.3:
+            other = rng.choice(duties)["Name"].lower()[:rng.randint(2, 6)]
+            fragment = f'"{fragment}" "{other}"'
+        queries.append(fragment)
+    return queries
+
+
+def test_search_matches_linear_scan():
+    duties = catalog_duties(3000)
+    index = SearchIndex(duties)
+    queries = QUERIES + random_queries(duties, random.Random(1), 300)
+    for query in queries:
+        matches = index.search(query)
+        expected = scan(duties, query)
+        assert (set(range(len(duties))) if matches is None else matches) == expected, query
+
+
+
+def test_blank_parts_between_quotes_are_not_phrases():
+    duties = [{"Name": "The Keeper of the Lake"}, {"Name": "Sastasha"}, {"Name": "Castrum Abania"}, {"Name": "The Vault"}]
+    index = SearchIndex(duties)
+    # The space between the quoted phrases used to be searched for as well, matching "Castrum Abania"
+    assert index.search('"of" "vault"') == {0, 3}
+    assert index.search('"" " "') == set()
@@ -0,0 +1,117 @@
+import json
+import random
+import sqlite3
+from benchmarks.generate import generate_catalog, write_catalog
+from data_handler import load_dungeon_data, serialize_dungeon_data
+from filter_engine import LEVEL_RANGES
+from profile_store import ProfileStore
+from sqlite_store import migrate_json_to_sqlite, save_dungeon_data
+from tracker_model import TrackerModel
+
+
+def test_both_backends_strip_presentation_tags(tmp_path):
+    data = [{"expansion": "A Realm Reborn", "duties": [{"type": "Dungeons", "duties": [
+        {"Name": "Sastasha", "Level": 15, "Unlock": "Hard to Swallow", "Quest Type": "Main Scenario",
+         "Status": "Unlocked", "Tags": ["evenrow", "unlocked", "Favorite"]},
+    ]}]}]
+    json_file = tmp_path / "duties.json"
+    json_file.write_text(json.dumps(data), encoding='utf-8')
+    db_file = str(tmp_path / "duties.db")
+    # Written as an older version would have, tags included
+    save_dungeon_data(db_file, data)
+
+    from_json = load_dungeon_data(str(json_file))
+    from_sqlite = load_dungeon_data(db_file)
+    assert from_json[0]["duties"][0]["duties"][0]["Tags"] == ["Favorite"]
+    assert from_sqlite[0]["duties"][0]["duties"][0]["Tags"] == ["Favorite"]
+
+
+def random_view(data, rng):
+    choices = {
+        "Expansion": [expansion["expansion"] for expansion in data],
+        "Level": LEVEL_RANGES,
+        "Quest Type": ["Main Quest", "Feature Quest"],
+        "Duty Type": ["Dungeons", "Trials", "Raids", "Guildhests"],
+        "Status": ["Locked", "Unlocked"],
+    }
+    selected_filters = {category: set(rng.sample(values, rng.randint(1, 2))) if rng.random() < 0.4 else set()
+                        for category, values in choices.items()}
+    return selected_filters, rng.choice(QUERIES)
+
+
+QUERIES = ["", "the", "crystal", "tower 1", "dra*on", "*", "the *keep", '"vault" "abyss"', '""', "zzz", "50%", "a_b"]
+
+
+def test_sql_queries_match_the_in_memory_indexes(tmp_path):
+    db_file = str(tmp_path / "duties.db")
+    save_dungeon_data(db_file, generate_catalog(2000))
+    data = load_dungeon_data(db_file)
+    in_memory = TrackerModel(data)
+    in_sql = TrackerModel(data, db_path=db_file)
+    rng = random.Random(5)
+    for step in range(100):
+        selected_filters, query = random_view(data, rng)
+        assert in_sql.matching_positions(selected_filters, query) == in_memory.matching_positions(selected_filters, query), \
+            (selected_filters, query)
+
+
+def count_writes(db_file):
+    connection = sqlite3.connect(db_file)
+    try:
+        connection.execute("CREATE TABLE IF NOT EXISTS writes (name TEXT)")
+        connection.execute("DELETE FROM writes")
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            target = "old" if event == "DELETE" else "new"
+            connection.execute(f"CREATE TRIGGER IF NOT EXISTS count_{event} AFTER {event} ON duties "
+                               f"BEGIN INSERT INTO writes VALUES ({target}.name); END")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def written_names(db_file):
+    connection = sqlite3.connect(db_file)
+    try:
+        return [name for (name,) in connection.execute("SELECT name FROM writes")]
+    finally:
+        connection.close()
+
+
+def test_snapshots_write_only_changed_rows(tmp_path):
+    db_file = str(tmp_path / "duties.db")
+    data = generate_catalog(300)
+    save_dungeon_data(db_file, data)
+    duties = [duty for expansion in data for duty_type in expansion["duties"] for duty in duty_type["duties"]]
+
+    count_writes(db_file)
+    duties[10]["Status"] = "Unlocked" if duties[10]["Status"] == "Locked" else "Locked"
+    duties[20]["Tags"] = ["Favorite"]
+    save_dungeon_data(db_file, data)
+    assert sorted(written_names(db_file)) == sorted([duties[10]["Name"], duties[20]["Name"]])
+
+    count_writes(db_file)
+    save_dungeon_data(db_file, data)
+    assert written_names(db_file) == []
+
+    count_writes(db_file)
+    removed = data[-1]["duties"][-1]["duties"].pop()
+    save_dungeon_data(db_file, data)
+    assert written_names(db_file) == [removed["Name"]]
+    assert serialize_dungeon_data(load_dungeon_data(db_file)) == serialize_dungeon_data(data)
+
+
+def test_migration_keeps_profiles(tmp_path):
+    json_file = str(tmp_path / "duties.json")
+    profiles_file = str(tmp_path / "profiles.json")
+    db_file = str(tmp_path / "duties.db")
+    write_catalog(json_file, 300)
+    model = TrackerModel(load_dungeon_data(json_file))
+    profiles = ProfileStore(model, profiles_file)
+    profiles.create("Alt")
+    profiles.set_status("Alt", model.duty_ids[:25], "Unlocked")
+    profiles.save()
+
+    migrate_json_to_sqlite(json_file, db_file, str(tmp_path / "none.json"), str(tmp_path / "none.json"), profiles_file)
+    migrated = ProfileStore(TrackerModel(load_dungeon_data(db_file), db_path=db_file), db_file)
+    assert migrated.names() == ["Alt", "Default"]
+    assert migrated.profiles == profiles.profiles
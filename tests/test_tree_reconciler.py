@@ -0,0 +1,86 @@
+import random
+from benchmarks.generate import generate_catalog
+from duty_table import to_columnar
+from filter_engine import get_level_range
+from search_index import match_text
+from tests.memory_treeview import MemoryTreeview
+from tracker_model import TrackerModel
+from tree_reconciler import TreeReconciler
+
+QUERIES = ["", "", "the", "crystal", "tower 1", "dra*on", '"vault" "abyss"', "zzz"]
+
+
+def scan(data, selected_filters, query):
+    # The tree update_tree built from scratch before the reconciler, as parent -> children
+    tree = {"": []}
+    for exp_index, expansion in enumerate(data):
+        if selected_filters.get("Expansion") and expansion["expansion"] not in selected_filters["Expansion"]:
+            continue
+        exp_id = str(exp_index)
+        tree[exp_id] = []
+        for type_index, duty_type in enumerate(expansion["duties"]):
+            if selected_filters.get("Duty Type") and duty_type["type"] not in selected_filters["Duty Type"]:
+                continue
+            type_id = f"{exp_id}:{type_index}"
+            children = []
+            for duty_index, duty in enumerate(duty_type["duties"]):
+                values = {"Quest Type": duty["Quest Type"], "Status": duty["Status"], "Level": get_level_range(duty["Level"])}
+                if any(selected_filters.get(category) and value not in selected_filters[category] for category, value in values.items()):
+                    continue
+                if match_text(duty["Name"].lower(), query):
+                    children.append(f"{type_id}:{duty_index}")
+            if children:
+                tree[exp_id].append(type_id)
+                tree[type_id] = children
+        if tree[exp_id]:
+            tree[""].append(exp_id)
+        else:
+            del tree[exp_id]
+    return tree
+
+
+def shown(tree, parent=""):
+    # Only the items reachable from the root are on screen, detached parents keep their children
+    result = {parent: list(tree.get_children(parent))}
+    if parent.count(":") < 1:
+        for child in result[parent]:
+            result.update(shown(tree, child))
+    return result
+
+
+def random_filters(data, rng):
+    choices = {
+        "Expansion": [expansion["expansion"] for expansion in data],
+        "Duty Type": ["Dungeons", "Trials", "Raids", "Guildhests"],
+        "Quest Type": ["Main Quest", "Feature Quest"],
+        "Status": ["Locked", "Unlocked"],
+    }
+    return {category: set(rng.sample(values, rng.randint(1, 2))) if rng.random() < 0.4 else set()
+            for category, values in choices.items()}
+
+
+def test_reconcile_sequence_matches_rebuilt_tree():
+    data = generate_catalog(1500)
+    to_columnar(data)
+    model = TrackerModel(data)
+    tree = MemoryTreeview()
+    reconciler = TreeReconciler(tree)
+    model.subscribe("layout", lambda layout: reconciler.reconcile(layout, lambda iid: {"text": iid}))
+    rng = random.Random(3)
+    for step in range(150):
+        if step % 10 == 5:
+            model.set_status(rng.sample(model.duty_ids, 40), rng.choice(["Locked", "Unlocked"]))
+        model.set_view(random_filters(data, rng), rng.choice(QUERIES))
+        assert shown(tree) == scan(data, model.selected_filters, model.query), (model.selected_filters, model.query)
+
+
+def test_reconcile_returns_changed_parents():
+    tree = MemoryTreeview()
+    reconciler = TreeReconciler(tree)
+    create = lambda iid: {"text": iid}
+    layout = {"": ["0"], "0": ["0:0", "0:1"], "0:0": ["0:0:0", "0:0:1"], "0:1": ["0:1:0"]}
+    assert reconciler.reconcile(layout, create) == ["", "0", "0:0", "0:1"]
+    assert reconciler.reconcile(layout, create) == []
+    layout["0:0"] = ["0:0:1"]
+    assert reconciler.reconcile(layout, create) == ["0:0"]
+    assert tree.get_children("0:0") == ("0:0:1",)
@@ -1,70 +1,206 @@
 import tkinter as tk
 from tkinter import ttk
 import logging
-from data_handler import save_dungeon_data
 
-# Set up logging
-logging.basicConfig(filename='app.log', level=logging.DEBUG, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Widget options set by each role, mapped to the theme keys they are read from in order of preference
+ROLE_OPTIONS = {
+    "window": {"bg": ("bg",)},
+    "frame": {"bg": ("bg",)},
+    "label": {"bg": ("bg",), "fg": ("fg",)},
+    "button": {"bg": ("button_bg", "bg"), "fg": ("fg",)},
+    "entry": {"bg": ("entry_bg", "bg"), "fg": ("fg",)},
+    "menu": {"bg": ("menu_bg", "bg"), "fg": ("fg",)},
+    "checkbutton": {"bg": ("bg",), "fg": ("fg",), "selectcolor": ("button_bg", "bg")},
+    "treeview": {},
+}
+
+# Roles of the widget classes, checked in order so that subclasses come first
+ROLE_CLASSES = [
+    ((tk.Tk, tk.Toplevel), "window"),
+    ((tk.Frame, tk.LabelFrame), "frame"),
+    (tk.Label, "label"),
+    (tk.Button, "button"),
+    (tk.Entry, "entry"),
+    (tk.Menu, "menu"),
+    (tk.Checkbutton, "checkbutton"),
+    (ttk.Treeview, "treeview"),
+]
+
+# Values used when a theme defines none of the keys of an option
+THEME_DEFAULTS = {"fg": "#000000"}
+
+# Theme keys read by the ttk styles and by the row tags of a Treeview
+STYLE_KEYS = frozenset({"bg", "fg", "selected_bg", "button_bg"})
+TREEVIEW_KEYS = frozenset({"tree_evenrow_bg", "tree_oddrow_bg", "unlocked_bg", "disabled_fg"})
+
+# Registered widgets by the path of their window: window path -> {widget path: (widget, role)}
+_registry = {}
+# The theme last applied to each registered window, to work out what a theme change touches
+_applied = {}
+# Widgets registered into a window after it was themed, which still need every option
+_fresh = set()
+# The theme the ttk styles were last configured for
+_styled_theme = None
+
+def theme_value(theme, keys):
+    """
+    Look up the first of the given keys that the theme defines.
+    :return: The value, the default of the last key, or None if neither exists.
+    """
+    for key in keys:
+        if key in theme:
+            return theme[key]
+    return THEME_DEFAULTS.get(keys[-1])
+
+def resolve_role_options(theme):
+    """
+    Work out the widget options of every role for a theme, once per theme change instead of once per widget.
+    :return: Dict mapping each role to the options to configure, without those the theme leaves unset.
+    """
+    resolved = {}
+    for role, options in ROLE_OPTIONS.items():
+        values = {option: theme_value(theme, keys) for option, keys in options.items()}
+        resolved[role] = {option: value for option, value in values.items() if value is not None}
+    return resolved
+
+def widget_role(widget):
+    for classes, role in ROLE_CLASSES:
+        if isinstance(widget, classes):
+            return role
+    return None
+
+def register_widget(widget, role=None):
+    """
+    Register a widget so that theme changes reach it.
+    :param widget: The widget to theme.
+    :param role: One of ROLE_OPTIONS, by default worked out from the widget class.
+    """
+    role = role or widget_role(widget)
+    if role is None:
+        return
+    window = str(widget.winfo_toplevel())
+    _registry.setdefault(window, {})[str(widget)] = (widget, role)
+    if window in _applied:
+        _fresh.add(str(widget))
+
+def is_registered(widget):
+    entry = _registry.get(str(widget.winfo_toplevel()), {}).get(str(widget))
+    # A recreated window can reuse the path of a destroyed one
+    return entry is not None and entry[0] is widget
+
+def register_widget_tree(widget):
+    """
+    Register a widget and all of its descendants. Called once for every window, after its widgets are created.
+    """
+    pending = [widget]
+    while pending:
+        current = pending.pop()
+        register_widget(current)
+        pending.extend(current.winfo_children())
+
+def registered_widgets(root_widget):
+    """
+    Yield the (window path, widget, role) of the widgets registered in the window of root_widget and in
+    every window below it, dropping the widgets that were destroyed in the meantime.
+    """
+    root_path = str(root_widget)
+    prefix = "" if root_path == "." else root_path + "."
+    for window in list(_registry):
+        if window != root_path and not window.startswith(prefix):
+            continue
+        widgets = _registry[window]
+        for path, (widget, role) in list(widgets.items()):
+            try:
+                exists = widget.winfo_exists()
+            except tk.TclError:
+                exists = False
+            if not exists:
+                del widgets[path]
+                _fresh.discard(path)
+                continue
+            yield window, widget, role
+        if not widgets:
+            del _registry[window]
+            _applied.pop(window, None)
+
+def changed_theme_keys(old_theme, new_theme):
+    """
+    Return the keys whose values differ between two themes, or None if there is no old theme.
+    """
+    if old_theme is None:
+        return None
+    return {key for key in old_theme.keys() | new_theme.keys() if old_theme.get(key) != new_theme.get(key)}
+
+def changed_options(role, resolved, changed):
+    """
+    Select the options of a role that read one of the changed theme keys.
+    :param role: The widget role.
+    :param resolved: The options of every role for the new theme, from resolve_role_options.
+    :param changed: The changed theme keys, or None to select every option.
+    """
+    if changed is None:
+        return resolved[role]
+    keys = ROLE_OPTIONS[role]
+    return {option: value for option, value in resolved[role].items() if not changed.isdisjoint(keys[option])}
 
 def apply_theme(root_widget, theme):
     """
     Apply the given theme to the root widget and all of its children.
+    The window's widgets are registered the first time; afterwards a theme change is a single
+    pass over the registered widgets of the window and of every window below it, and only the
+    options reading a theme key that differs from the theme last applied to a window are set again.
     :param root_widget: The root widget of the application (usually the main window).
     :param theme: Dictionary containing theme settings.
     """
-    logging.info(f"Applying theme to root widget: {root_widget}")
-    root_widget.configure(bg=theme.get("bg"))
-
-    # Apply theme to all children widgets
-    update_widget_theme(root_widget, theme)
-
-def update_widget_theme(widget, theme):
-    for child in widget.winfo_children():
-        if isinstance(child, (tk.Frame, tk.LabelFrame, tk.Toplevel)):
-            logging.debug(f"Updating Frame/LabelFrame/Toplevel: {child}")
-            child.configure(bg=theme.get("bg"))
-        elif isinstance(child, tk.Label):
-            logging.debug(f"Updating Label: {child}")
-            child.configure(bg=theme.get("bg"), fg=theme.get("fg", "#000000"))
-        elif isinstance(child, tk.Button):
-            logging.debug(f"Updating Button: {child}")
-            child.configure(bg=theme.get("button_bg", theme.get("bg")), fg=theme.get("fg", "#000000"))
-        elif isinstance(child, tk.Entry):
-            logging.debug(f"Updating Entry: {child}")
-            child.configure(bg=theme.get("entry_bg", theme.get("bg")), fg=theme.get("fg", "#000000"))
-        elif isinstance(child, tk.Menu):
-            logging.debug(f"Updating Menu: {child}")
-            child.configure(bg=theme.get("menu_bg", theme.get("bg")), fg=theme.get("fg", "#000000"))
-        elif isinstance(child, tk.Checkbutton):
-            logging.debug(f"Updating Checkbutton: {child}")
-            child.configure(bg=theme.get("bg"), fg=theme.get("fg", "#000000"), selectcolor=theme.get("button_bg", theme.get("bg")))
-        elif isinstance(child, ttk.Treeview):
-            logging.debug(f"Updating Treeview: {child}")
-            update_treeview_theme(child, theme)
-        elif isinstance(child, ttk.Button):
-            logging.debug(f"Updating ttk.Button: {child}")
-            style = ttk.Style()
-            style.configure("TButton", background=theme.get("button_bg", theme.get("bg")), foreground=theme.get("fg", "#000000"))
-        elif isinstance(child, ttk.Label):
-            logging.debug(f"Updating ttk.Label: {child}")
-            style = ttk.Style()
-            style.configure("TLabel", background=theme.get("bg"), foreground=theme.get("fg", "#000000"))
-
-        # Recurse into child widgets
-        update_widget_theme(child, theme)
+    global _styled_theme
+    logger.info(f"Applying theme to root widget: {root_widget}")
+    if not is_registered(root_widget):
+        register_widget_tree(root_widget)
+    theme = dict(theme)
+
+    style_changes = changed_theme_keys(_styled_theme, theme)
+    if style_changes is None or not style_changes.isdisjoint(STYLE_KEYS):
+        configure_ttk_styles(theme)
+    _styled_theme = theme
+
+    resolved = resolve_role_options(theme)
+    changes = {}
+    count = 0
+    for window, widget, role in registered_widgets(root_widget):
+        if window not in changes:
+            changes[window] = changed_theme_keys(_applied.get(window), theme)
+        path = str(widget)
+        changed = None if path in _fresh else changes[window]
+        _fresh.discard(path)
+        if role == "treeview":
+            if changed is None or not changed.isdisjoint(TREEVIEW_KEYS):
+                configure_treeview_tags(widget, theme)
+                count += 1
+            continue
+        options = changed_options(role, resolved, changed)
+        if options:
+            widget.configure(**options)
+            count += 1
+    for window in changes:
+        _applied[window] = theme
+    logger.debug(f"Theme applied to {count} widgets.")
 
 def apply_theme_to_new_window(window, theme):
-    logging.info(f"Applying theme to new window: {window}")
+    logger.info(f"Applying theme to new window: {window}")
     
-    # Treat the new window as the root widget and apply the theme
+    # Register the new window's widgets and apply the theme to them
+    register_widget_tree(window)
     apply_theme(window, theme)
 
     # Force window to redraw and update all widgets
     window.update_idletasks()
 
-def update_treeview_theme(treeview, theme):
-    logging.info(f"Updating Treeview theme for: {treeview}")
+def configure_ttk_styles(theme):
+    """
+    Configure the ttk styles shared by all ttk widgets, once per theme change.
+    """
     style = ttk.Style()
 
     # Configure the general style of the Treeview
@@ -76,6 +212,13 @@ def update_treeview_theme(treeview, theme):
     # Configure the row colors for the Treeview
     style.map("Treeview", background=[("selected", theme.get("selected_bg", "#3399ff"))])
 
+    style.configure("TButton", background=theme.get("button_bg", theme.get("bg")), foreground=theme.get("fg", "#000000"))
+    style.configure("TLabel", background=theme.get("bg"), foreground=theme.get("fg", "#000000"))
+
+def configure_treeview_tags(treeview, theme):
+    """
+    Configure the row tags of one Treeview; tags belong to the widget, unlike styles.
+    """
     # Configure the alternating row colors (odd and even rows)
     treeview.tag_configure("evenrow", background=theme.get("tree_evenrow_bg", "#ffffff"))
     treeview.tag_configure("oddrow", background=theme.get("tree_oddrow_bg", "#f9f9f9"))
@@ -86,94 +229,29 @@ def update_treeview_theme(treeview, theme):
     # Apply the style to the Treeview
     treeview.configure(style="Treeview")
 
-def update_locked_state(treeview):
+def apply_even_odd_tags(treeview):
     """
-    Update the visual state of locked/unlocked items in the Treeview.
-    This method will iterate through all items and update their color based on their status.
+    Stripe the visible duty rows of the Treeview in a single pass.
+    Striping is presentation only, it is computed from each row's visible position and never stored in the data.
+    :param treeview: The Treeview to stripe.
     """
-    logging.info("Updating locked state for Treeview.")
+    for expansion_id in treeview.get_children():
+        for duty_type_id in treeview.get_children(expansion_id):
+            stripe_rows(treeview, duty_type_id)
 
-    # Get all top-level items
-    top_level_items = treeview.get_children()
-    
-    # Iterate over all top-level items and their descendants
-    for item in top_level_items:
-        update_item_color(treeview, item)
-        
-    logging.info("Finished updating locked state.")
-
-def update_item_color(treeview, item):
-    # Fetch the values of the item (assuming the third column is 'Status')
-    values = treeview.item(item, 'values')
-    
-    # Print or log the values to verify the function is working as expected
-    print(f"Processing item: {item}, Values: {values}")
-    logging.debug(f"Processing item: {item}, Values: {values}")
-
-    if len(values) > 3 and values[3] == 'Unlocked':
-        # Apply the 'unlocked' tag which turns the line green and disables it
-        treeview.item(item, tags=("unlocked",))
-        logging.debug(f"Item {item} is unlocked and marked green.")
-    else:
-        logging.debug(f"Item {item} is not unlocked, no color change applied.")
-        
-    # Recurse through child items and update their state
-    for child in treeview.get_children(item):
-        update_item_color(treeview, child)
-
-def apply_even_odd_tags(treeview, data):
-    for expansion in data:
-        expansion_id = treeview.get_children()[0]  # Get the expansion item from the treeview
-
-        # Now process each duty type under this expansion
-        for duty_type in treeview.get_children(expansion_id):
-            row_count = 0  # Reset row count for each duty type
-
-            for duty_index, duty_item_id in enumerate(treeview.get_children(duty_type)):
-                tags = treeview.item(duty_item_id, 'tags')
-
-                # Only apply evenrow/oddrow tags if the duty is not unlocked
-                if 'unlocked' not in tags:
-                    tag = 'evenrow' if row_count % 2 == 0 else 'oddrow'
-                    treeview.item(duty_item_id, tags=(tag,))
-                    row_count += 1  # Increment row count only for non-unlocked items
-                else:
-                    tag = 'unlocked'
-                    treeview.item(duty_item_id, tags=('unlocked',))
-
-                # Update the JSON data with the correct tag
-                duty_name = treeview.item(duty_item_id, 'text')
-                update_tags_in_json(data, expansion['expansion'], treeview.item(duty_type, 'text'), duty_name, tag)
-
-def apply_even_odd_tags_recursive(treeview, item, idx):
-    """
-    Recursively apply even/odd tags to child items in the Treeview.
-    """
-    for child_idx, child in enumerate(treeview.get_children(item)):
-        # Apply even/odd tags but don't overwrite the "unlocked" tag
-        tags = treeview.item(child, 'tags')
-        if "unlocked" not in tags:
-            row_tag = "evenrow" if (idx + child_idx) % 2 == 0 else "oddrow"
-            treeview.item(child, tags=(row_tag,))
-        apply_even_odd_tags_recursive(treeview, child, idx + child_idx)
-
-def update_tags_in_json(data, expansion_name, duty_type_name, duty_name, new_tag):
-    """
-    Update the tags in the JSON data for a specific duty.
-    :param data: The JSON data.
-    :param expansion_name: The name of the expansion.
-    :param duty_type_name: The name of the duty type.
-    :param duty_name: The name of the duty.
-    :param new_tag: The new tag to apply (either 'evenrow' or 'oddrow').
-    """
-    for expansion in data:
-        if expansion['expansion'] == expansion_name:
-            for duty_type in expansion['duties']:
-                if duty_type['type'] == duty_type_name:
-                    for duty in duty_type['duties']:
-                        if duty['Name'] == duty_name:
-                            # Remove 'evenrow' and 'oddrow' tags if they exist
-                            duty['Tags'] = [tag for tag in duty.get('Tags', []) if tag not in ('evenrow', 'oddrow')]
-                            # Add the new tag
-                            duty['Tags'].append(new_tag)
-                            return
+def stripe_rows(treeview, parent):
+    """
+    Apply evenrow/oddrow tags to the children of one duty type, counting only rows that are not unlocked.
+    Unlocked rows get the 'unlocked' tag instead.
+    :param treeview: The Treeview containing the rows.
+    :param parent: The item id of the duty type whose rows are striped.
+    """
+    row_count = 0
+    for duty_item_id in treeview.get_children(parent):
+        values = treeview.item(duty_item_id, 'values')
+        if len(values) > 2 and values[2] == 'Unlocked':
+            tag = 'unlocked'
+        else:
+            tag = 'evenrow' if row_count % 2 == 0 else 'oddrow'
+            row_count += 1
+        treeview.item(duty_item_id, tags=(tag,))
@@ -0,0 +1,144 @@
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from image_manifest import image_dimensions, load_manifest
+from asset_pack import open_asset, asset_mtime_ns
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_FOLDER = 'thumbnails'
+# Bounding boxes of the pre-scaled variants, smallest first.
+# The quest info images are about 260x340 px and the info window shows them at full size, so the
+# window decodes the originals; the variants serve images and views larger than the variant.
+THUMBNAIL_SIZES = (128, 256, 512)
+THUMBNAIL_QUALITY = 85
+
+def thumbnail_path(image_folder, image_path, size, cache_folder=THUMBNAIL_FOLDER):
+    """
+    Return where the variant of an image with the given bounding box is stored.
+    The cache folder mirrors the layout of the image folder, one subfolder per size.
+    """
+    relative = os.path.relpath(image_path, image_folder)
+    return os.path.join(cache_folder, str(size), os.path.splitext(relative)[0] + ".jpg")
+
+def is_fresh(variant_path, image_path):
+    """
+    Check whether a variant exists and is not older than its source image.
+    """
+    try:
+        return os.stat(variant_path).st_mtime_ns >= asset_mtime_ns(image_path)
+    except OSError:
+        return False
+
+def variant_sizes(dimensions):
+    """
+    Return the variant sizes worth generating for an image: only those that are smaller than the image.
+    """
+    return [size for size in THUMBNAIL_SIZES if size < max(dimensions)]
+
+def make_thumbnails(image_folder, image_path, cache_folder=THUMBNAIL_FOLDER):
+    """
+    Generate every variant of an image from a single decode. Each variant is scaled down
+    from the next larger one, and the JPEG decoder is asked for the largest needed size only.
+    :return: The number of variants written.
+    """
+    with open_asset(image_path) as file, Image.open(file) as img:
+        sizes = variant_sizes(img.size)
+        if not sizes:
+            return 0
+        img.draft("RGB", (sizes[-1], sizes[-1]))
+        img = img.convert("RGB")
+    for size in reversed(sizes):
+        img.thumbnail((size, size))
+        target = thumbnail_path(image_folder, image_path, size, cache_folder)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # A unique temporary file, so that processes building the same image never write to the same file
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                img.save(f, "JPEG", quality=THUMBNAIL_QUALITY)
+            os.replace(temp_path, target)
+        except Exception:
+            os.remove(temp_path)
+            raise
+    return len(sizes)
+
+def best_variant(image_folder, image_path, max_size, cache_folder=THUMBNAIL_FOLDER):
+    """
+    Return the smallest stored image that still has enough pixels to be shown within max_size,
+    generating the variants first if they are missing or outdated.
+    Variants are only smaller than the image, so an image shown at its full size (as quest info
+    images are in the info window) is always read from the original.
+    :param image_folder: Root folder of the images.
+    :param image_path: The full path of the original image.
+    :param max_size: The (width, height) the image is shown in.
+    :return: The path of a variant, or image_path if the original is needed.
+    """
+    # A variant has fewer pixels than a box larger than the largest variant, so the original is
+    # needed whatever the image size; this skips reading its header on every decode
+    if min(max_size) > THUMBNAIL_SIZES[-1]:
+        return image_path
+    dimensions = image_dimensions(image_path)
+    if not dimensions:
+        return image_path
+    width, height = dimensions
+    if max_size[0] >= width and max_size[1] >= height:
+        # Shown at full size
+        return image_path
+    # The image is never scaled up, so it is shown at this scale
+    scale = min(max_size[0] / width, max_size[1] / height)
+    for size in variant_sizes(dimensions):
+        if min(size / width, size / height) >= scale:
+            variant = thumbnail_path(image_folder, image_path, size, cache_folder)
+            if not is_fresh(variant, image_path):
+                try:
+                    make_thumbnails(image_folder, image_path, cache_folder)
+                except OSError as e:
+                    logger.error(f"Failed to generate thumbnails for {image_path}: {e}")
+                    return image_path
+            return variant
+    return image_path
+
+def _build_one(args):
+    image_folder, image_path, cache_folder = args
+    try:
+        return make_thumbnails(image_folder, image_path, cache_folder)
+    except OSError as e:
+        logger.error(f"Failed to generate thumbnails for {image_path}: {e}")
+        return 0
+
+def build_thumbnails(image_folder, cache_folder=THUMBNAIL_FOLDER, workers=None):
+    """
+    Generate the variants of every image in the manifest that has none or outdated ones,
+    spread over a pool of processes.
+    :param image_folder: Root folder of the images.
+    :param cache_folder: The folder the variants are written to.
+    :param workers: Number of processes, by default one per CPU.
+    :return: The number of variants written.
+    """
+    manifest = load_manifest(image_folder)
+    jobs = []
+    for entry in manifest.entries.values():
+        image_path = os.path.join(image_folder, entry["path"])
+        sizes = variant_sizes(entry["dimensions"]) if entry["dimensions"] else THUMBNAIL_SIZES
+        if not all(is_fresh(thumbnail_path(image_folder, image_path, size, cache_folder), image_path) for size in sizes):
+            jobs.append((image_folder, image_path, cache_folder))
+    if not jobs:
+        return 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        written = sum(executor.map(_build_one, jobs, chunksize=8))
+    logger.info(f"Generated {written} thumbnails for {len(jobs)} images in {cache_folder}.")
+    return written
+
+if __name__ == "__main__":
+    configure_logging()
+    if len(sys.argv) > 2:
+        print("Usage: python thumbnails.py [image folder]")
+        sys.exit(1)
+    folder = sys.argv[1] if len(sys.argv) == 2 else "QuestInfo"
+    count = build_thumbnails(folder)
+    print(f"Generated {count} thumbnails in {THUMBNAIL_FOLDER}.")
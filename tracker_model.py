@@ -0,0 +1,195 @@
+import logging
+from collections import defaultdict
+from contextlib import nullcontext
+from data_handler import get_duty_registry, journal_entry
+from filter_engine import FilterEngine, iter_bits
+from search_index import SearchIndex
+from sqlite_store import query_positions
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("Locked", "Unlocked")
+
+class TrackerModel:
+    """
+    The tracker without its window: the dungeon data, the search and filter indexes, the current
+    filters and search query, and every change made to a duty's status.
+
+    Views subscribe to events instead of reading the model back:
+    - "layout" (layout): the visible layout changed. The layout maps "" to the visible expansion ids,
+      each expansion id to its duty type ids and each duty type id to its duty ids, parents first.
+    - "status" (duty_ids): the status of these duties changed.
+    - "tags" (duty_ids): the tags of these duties changed.
+    Nothing here depends on Tk, so the model can be driven from scripts, benchmarks and worker processes.
+    """
+
+    def __init__(self, data, persistence=None, db_path=None):
+        """
+        :param data: The dungeon data as loaded by load_dungeon_data.
+        :param persistence: Optional PersistenceService saving the changes. Without one the data is only changed in memory.
+        :param db_path: The SQLite database the data was loaded from, if any. Filters and searches then run as SQL queries.
+        """
+        self.data = data
+        self.persistence = persistence
+        self.db_path = db_path
+        self.listeners = defaultdict(list)
+        self.selected_filters = {}
+        self.query = ""
+        self.build_indexes()
+        self.layout = {"": []}
+        self.visible_duties = []
+        self.visible_index = {}
+
+    def build_indexes(self):
+        """
+        Index every duty for searching and filtering. Positions in both indexes follow the order of self.data.
+        """
+        logger.info("Building search index and filter bitmaps.")
+        self.registry = get_duty_registry(self.data)
+        self.duty_ids = self.registry.ids
+        self.duty_parents = []
+        for duty_id in self.duty_ids:
+            type_id = duty_id.rsplit(":", 1)[0]
+            self.duty_parents.append((type_id.split(":", 1)[0], type_id))
+
+        # Searches of an SQLite source run in the database
+        self.search_index = None if self.db_path is not None else SearchIndex(self.registry.get(duty_id) for duty_id in self.duty_ids)
+        self.filter_engine = FilterEngine(self.data)
+        logger.info(f"Indexes built for {len(self.duty_ids)} duties.")
+
+    def subscribe(self, event, callback):
+        """
+        Call a function every time an event is emitted, with the event's arguments.
+        """
+        self.listeners[event].append(callback)
+
+    def unsubscribe(self, event, callback):
+        self.listeners[event].remove(callback)
+
+    def emit(self, event, *args):
+        for callback in list(self.listeners[event]):
+            callback(*args)
+
+    def set_view(self, selected_filters=None, query=None):
+        """
+        Change the filters and/or the search query and recompute the visible layout.
+        :param selected_filters: Dict mapping a filter category to the set of selected values, None to keep the current filters.
+        :param query: The search query, None to keep the current query.
+        """
+        if selected_filters is not None:
+            self.selected_filters = {category: set(values) for category, values in selected_filters.items()}
+        if query is not None:
+            self.query = query.lower()
+        self.refresh()
+
+    def matching_positions(self, selected_filters=None, query=None):
+        """
+        Return the catalog positions of the duties passing filters and a search query, in catalog order.
+        :param selected_filters: The filters, by default the current ones.
+        :param query: The search query, by default the current one.
+        """
+        selected_filters = self.selected_filters if selected_filters is None else selected_filters
+        query = self.query if query is None else query
+        if self.db_path is not None:
+            # Status filters read the database, which must hold the changes still waiting to be written
+            if self.persistence is not None:
+                self.persistence.flush()
+            return query_positions(self.db_path, selected_filters, query)
+        matches = self.search_index.search(query)
+        positions = iter_bits(self.filter_engine.match(selected_filters))
+        if matches is None:
+            return list(positions)
+        return [position for position in positions if position in matches]
+
+    def refresh(self):
+        """
+        Work out which expansions, duty types and duties are visible and emit the "layout" event.
+        """
+        layout = {"": []}
+        for position in self.matching_positions():
+            exp_id, type_id = self.duty_parents[position]
+            if type_id not in layout:
+                if exp_id not in layout:
+                    layout[exp_id] = []
+                    layout[""].append(exp_id)
+                layout[exp_id].append(type_id)
+                layout[type_id] = []
+            layout[type_id].append(self.duty_ids[position])
+        self.layout = layout
+        # Duties in the order they appear in the filtered view, to find the neighbors of a row
+        self.visible_duties = [duty_id for iid, children in layout.items() if iid.count(":") == 1 for duty_id in children]
+        self.visible_index = {duty_id: index for index, duty_id in enumerate(self.visible_duties)}
+        self.emit("layout", layout)
+
+    def duty(self, duty_id):
+        """
+        Return the duty dictionary of a duty id, or None if it is unknown.
+        """
+        return self.registry.get(duty_id)
+
+    def status(self, duty_id):
+        return self.registry.get(duty_id)["Status"]
+
+    def location(self, duty_id):
+        """
+        Return the (expansion, duty type) names a duty belongs to.
+        """
+        exp_index, type_index = map(int, duty_id.split(":")[:2])
+        expansion = self.data[exp_index]
+        return expansion["expansion"], expansion["duties"][type_index]["type"]
+
+    def _mutate(self):
+        if self.persistence is None:
+            return nullcontext([])
+        return self.persistence.mutate()
+
+    def set_status(self, duty_ids, new_status):
+        """
+        Give duties a new status, save the change and emit the "status" event.
+        :param duty_ids: The ids of the duties to change.
+        :param new_status: "Locked" or "Unlocked".
+        :return: The ids of the duties whose status actually changed.
+        """
+        changed = [duty_id for duty_id in duty_ids if self.status(duty_id) != new_status]
+        if not changed:
+            return changed
+        with self._mutate() as journal:
+            for duty_id in changed:
+                self.registry.set_status(duty_id, new_status)
+                self.filter_engine.set_status(self.registry.positions[duty_id], new_status)
+                journal.append(journal_entry("status", self.registry.key(duty_id), new_status))
+        logger.info(f"Status of {len(changed)} duties set to {new_status}.")
+        self.emit("status", changed)
+        return changed
+
+    def set_tags(self, duty_id, new_tags):
+        """
+        Replace the tags of a duty, save the change and emit the "tags" event.
+        """
+        with self._mutate() as journal:
+            self.registry.set_tags(duty_id, new_tags)
+            journal.append(journal_entry("tags", self.registry.key(duty_id), list(new_tags)))
+        self.emit("tags", [duty_id])
+
+    def toggle_status(self, duty_id):
+        """
+        Switch a duty between locked and unlocked.
+        :return: The new status.
+        """
+        new_status = "Unlocked" if self.status(duty_id) == "Locked" else "Locked"
+        self.set_status([duty_id], new_status)
+        return new_status
+
+    def reset_status(self):
+        """
+        Lock every duty and clear its tags, then recompute the visible layout.
+        """
+        logger.info("Resetting status of all duties to 'Locked'.")
+        with self._mutate() as journal:
+            for duty_id in self.duty_ids:
+                self.registry.set_status(duty_id, "Locked")
+                self.registry.set_tags(duty_id, [])
+            journal.append(journal_entry("reset"))
+        self.filter_engine.reset_status("Locked")
+        self.emit("status", self.duty_ids)
+        self.refresh()
@@ -0,0 +1,72 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TreeReconciler:
+    """
+    Keep Treeview items alive between refreshes and apply only the detach/reattach/move
+    operations needed to go from the previously visible set of items to a new one.
+
+    Every node is identified by a stable item id chosen by the caller, so an item is
+    created once (the first time it becomes visible) and afterwards only detached and
+    reattached. All children of a parent must always be requested in the same relative
+    order, which is the order of the underlying data.
+    """
+
+    def __init__(self, treeview):
+        """
+        :param treeview: The ttk.Treeview whose items are managed.
+        """
+        self.tree = treeview
+        # parent iid -> tuple of child iids currently attached under it
+        self.attached = {}
+
+    def reconcile(self, layout, create_item):
+        """
+        Bring the Treeview in line with the given layout.
+        :param layout: A dict mapping each parent iid ("" for the root) to the ordered list
+                       of child iids that should be attached under it. Parents missing from
+                       the layout are left untouched.
+        :param create_item: Callable taking an iid and returning the keyword arguments used
+                            to insert it (text, values, tags, open) the first time it is needed.
+        :return: The parents whose attached children changed, in layout order.
+        """
+        operations = 0
+        changed = []
+        for parent, children in layout.items():
+            children = tuple(children)
+            previous = self.attached.get(parent, ())
+            if previous == children:
+                continue
+
+            wanted = set(children)
+            removed = [iid for iid in previous if iid not in wanted]
+            if removed:
+                self.tree.detach(*removed)
+                operations += len(removed)
+
+            # Both lists are subsequences of the same data order, so once the removed
+            # items are gone every added item can be placed directly at its final index.
+            kept = set(previous)
+            for index, iid in enumerate(children):
+                if iid in kept:
+                    continue
+                if self.tree.exists(iid):
+                    self.tree.move(iid, parent, index)
+                else:
+                    self.tree.insert(parent, index, iid=iid, **create_item(iid))
+                operations += 1
+
+            self.attached[parent] = children
+            changed.append(parent)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Tree reconciled with {operations} operations.")
+        return changed
+
+    def children(self, parent):
+        """
+        Return the child iids currently attached under a parent, as last reconciled.
+        :param parent: The parent iid ("" for the root).
+        """
+        return self.attached.get(parent, ())
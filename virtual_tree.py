@@ -0,0 +1,387 @@
+import logging
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+
+logger = logging.getLogger(__name__)
+
+# Number of Tk rows kept beyond the ones that fit in the viewport
+DEFAULT_OVERSCAN = 2
+INDENT = "    "
+OPEN_GLYPH = "▾ "
+CLOSED_GLYPH = "▸ "
+
+class _Node:
+    __slots__ = ("text", "values", "tags", "open", "parent", "children", "attached")
+
+    def __init__(self, parent, text="", values=(), tags=(), open=False):
+        self.text = text
+        self.values = tuple(values)
+        self.tags = tuple(tags)
+        self.open = open
+        self.parent = parent
+        self.children = []
+        self.attached = False
+
+class VirtualTreeview(tk.Frame):
+    """
+    A Treeview replacement that keeps the whole tree as a model in Python and only materializes
+    the Tk rows needed for the viewport, plus a small overscan. Scrolling rebinds the same pooled
+    rows to other model items instead of creating new ones.
+
+    It offers the subset of the ttk.Treeview API used by the tracker (insert, detach, move, item,
+    get_children, parent, index, exists, selection, identify_row, ...), in terms of model item ids.
+    Nested items are drawn indented, with an arrow that toggles them open when clicked.
+    """
+
+    def __init__(self, master, columns=(), show="tree headings", yscrollcommand=None, overscan=DEFAULT_OVERSCAN):
+        """
+        :param master: The parent widget.
+        :param columns: The data columns, as for ttk.Treeview.
+        :param show: Which parts of the Treeview to show, as for ttk.Treeview.
+        :param yscrollcommand: Callback receiving the visible (first, last) fractions, usually a Scrollbar's set.
+        :param overscan: Number of extra Tk rows kept beyond the viewport.
+        """
+        super().__init__(master)
+        self.view = ttk.Treeview(self, columns=columns, show=show)
+        self.view.pack(fill=tk.BOTH, expand=True)
+        self.yscrollcommand = yscrollcommand
+        self.overscan = overscan
+
+        self.nodes = {"": _Node(None, open=True)}
+        self.nodes[""].attached = True
+        self.selected = []
+        self.focused = ""
+        self.offset = 0
+        self.pool = []
+        self._shown = 0
+        self.slot_rows = []
+        self._rows = None
+        self._render_pending = False
+        self._next_id = 0
+        # The selection the application was last told about through <<TreeviewSelect>>
+        self._announced = ()
+        # Row height and font of the Treeview style, looked up again when the theme or a style changes
+        self._metrics = None
+
+        # Internal bindings live on their own bindtag so that bind() calls from the application do not replace them.
+        # Selection events go through a tag placed before the application's, so the ones caused by re-rendering can be stopped.
+        tag = f"VirtualTreeview{id(self)}"
+        select_tag = f"VirtualTreeviewSelect{id(self)}"
+        self.view.bindtags((select_tag, self.view.bindtags()[0], tag) + self.view.bindtags()[1:])
+        self.view.bind_class(select_tag, "<<TreeviewSelect>>", self._on_view_select)
+        self.view.bind_class(tag, "<Configure>", lambda event: self.refresh())
+        self.view.bind_class(tag, "<<ThemeChanged>>", self._on_theme_changed)
+        self.view.bind_class(tag, "<Button-1>", self._on_click)
+        self.view.bind_class(tag, "<MouseWheel>", self._on_mousewheel)
+        self.view.bind_class(tag, "<Button-4>", lambda event: self._scroll_units(-3))
+        self.view.bind_class(tag, "<Button-5>", lambda event: self._scroll_units(3))
+        self.view.bind_class(tag, "<Up>", lambda event: self._move_focus(-1))
+        self.view.bind_class(tag, "<Down>", lambda event: self._move_focus(1))
+        self.view.bind_class(tag, "<Prior>", lambda event: self._scroll_units(-self._viewport_rows()))
+        self.view.bind_class(tag, "<Next>", lambda event: self._scroll_units(self._viewport_rows()))
+
+    # --- Treeview API -------------------------------------------------------------------------
+
+    def bind(self, sequence=None, func=None, add=None):
+        return self.view.bind(sequence, func, add)
+
+    def heading(self, column, option=None, **kwargs):
+        return self.view.heading(column, option, **kwargs)
+
+    def column(self, column, option=None, **kwargs):
+        return self.view.column(column, option, **kwargs)
+
+    def tag_configure(self, tagname, option=None, **kwargs):
+        return self.view.tag_configure(tagname, option, **kwargs)
+
+    def exists(self, item):
+        return item in self.nodes
+
+    def insert(self, parent, index, iid=None, **kwargs):
+        if iid is None:
+            self._next_id += 1
+            iid = f"I{self._next_id:03X}"
+        if iid in self.nodes:
+            raise tk.TclError(f'Item {iid} already exists')
+        self.nodes[iid] = _Node(parent, **kwargs)
+        self._attach(iid, parent, index)
+        return iid
+
+    def detach(self, *items):
+        for item in items:
+            node = self.nodes[item]
+            if node.attached:
+                self.nodes[node.parent].children.remove(item)
+                node.attached = False
+        self._structure_changed()
+
+    def move(self, item, parent, index):
+        node = self.nodes[item]
+        if node.attached:
+            self.nodes[node.parent].children.remove(item)
+        node.parent = parent
+        self._attach(item, parent, index)
+
+    def delete(self, *items):
+        for item in items:
+            node = self.nodes.pop(item, None)
+            if node is None:
+                continue
+            if node.attached and node.parent in self.nodes:
+                self.nodes[node.parent].children.remove(item)
+            self.delete(*node.children)
+            if item in self.selected:
+                self.selected.remove(item)
+        self._structure_changed()
+
+    def get_children(self, item=""):
+        return tuple(self.nodes[item].children)
+
+    def parent(self, item):
+        return self.nodes[item].parent or ""
+
+    def index(self, item):
+        node = self.nodes[item]
+        return self.nodes[node.parent].children.index(item) if node.attached else 0
+
+    def item(self, item, option=None, **kwargs):
+        node = self.nodes[item]
+        if option is not None:
+            return getattr(node, option)
+        if not kwargs:
+            return {"text": node.text, "values": node.values, "tags": node.tags, "open": node.open}
+        for option, value in kwargs.items():
+            if option in ("values", "tags"):
+                value = (value,) if isinstance(value, str) else tuple(value)
+            setattr(node, option, value)
+        if "open" in kwargs:
+            self._structure_changed()
+        else:
+            self._schedule_render()
+
+    def selection(self):
+        return tuple(self.selected)
+
+    def selection_set(self, *items):
+        if len(items) == 1 and isinstance(items[0], (list, tuple)):
+            items = items[0]
+        self.selected = [item for item in items if item in self.nodes]
+        if self.selected:
+            self.focused = self.selected[-1]
+        # Render right away so the Tk selection never lags behind the model
+        shown = self.view.selection()
+        self.refresh()
+        if self.view.selection() == shown:
+            # Tk only reports changes to the rows it shows; report selections made outside the viewport too
+            self.view.event_generate("<<TreeviewSelect>>")
+
+    def focus(self, item=None):
+        if item is None:
+            return self.focused
+        self.focused = item
+
+    def identify_row(self, y):
+        slot = self.view.identify_row(y)
+        return self.slot_rows[self.pool.index(slot)] if slot in self.pool else ""
+
+    def see(self, item):
+        parent = self.nodes[item].parent
+        while parent:
+            self.nodes[parent].open = True
+            parent = self.nodes[parent].parent
+        self._structure_changed()
+        rows = self.visible_rows()
+        position = next((index for index, (row, depth) in enumerate(rows) if row == item), None)
+        if position is None:
+            return
+        viewport = self._viewport_rows()
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + viewport:
+            self.offset = position - viewport + 1
+        self._schedule_render()
+
+    def yview(self, *args):
+        if not args:
+            return self._fractions()
+        rows = len(self.visible_rows())
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * rows)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self._viewport_rows()
+            self.offset += amount
+        self._schedule_render()
+
+    # --- Model ----------------------------------------------------------------------------------
+
+    def visible_rows(self):
+        """
+        Return the (item, depth) pairs of every row reachable through open nodes, in display order.
+        The list is cached until the structure or the open state of the tree changes.
+        """
+        if self._rows is None:
+            rows = []
+            stack = [(child, 0) for child in reversed(self.nodes[""].children)]
+            while stack:
+                item, depth = stack.pop()
+                rows.append((item, depth))
+                node = self.nodes[item]
+                if node.open:
+                    stack.extend((child, depth + 1) for child in reversed(node.children))
+            self._rows = rows
+        return self._rows
+
+    def _attach(self, item, parent, index):
+        siblings = self.nodes[parent].children
+        siblings.insert(len(siblings) if index == "end" else int(index), item)
+        self.nodes[item].attached = True
+        self._structure_changed()
+
+    def _structure_changed(self):
+        self._rows = None
+        self._schedule_render()
+
+    # --- Rendering ------------------------------------------------------------------------------
+
+    def refresh(self):
+        """
+        Render the viewport now instead of waiting for the event loop to go idle.
+        """
+        self._render_pending = False
+        rows = self.visible_rows()
+        viewport = self._viewport_rows()
+        self.offset = max(0, min(self.offset, len(rows) - viewport))
+        wanted = min(viewport + self.overscan, len(rows) - self.offset)
+
+        # Pooled rows pool[:_shown] are attached in order; reattach or create rows up to the wanted count
+        for slot in self.pool[self._shown:wanted]:
+            self.view.move(slot, "", "end")
+        while len(self.pool) < wanted:
+            self.pool.append(self.view.insert("", "end"))
+        if self._shown > wanted:
+            self.view.detach(*self.pool[wanted:self._shown])
+        self._shown = wanted
+
+        self.slot_rows = []
+        selected = set(self.selected)
+        view_selection = []
+        for index in range(wanted):
+            item, depth = rows[self.offset + index]
+            node = self.nodes[item]
+            slot = self.pool[index]
+            prefix = INDENT * depth
+            if node.children:
+                prefix += OPEN_GLYPH if node.open else CLOSED_GLYPH
+            self.view.item(slot, text=prefix + node.text, values=node.values, tags=node.tags)
+            self.slot_rows.append(item)
+            if item in selected:
+                view_selection.append(slot)
+        # Setting the Tk selection queues a <<TreeviewSelect>>, so it is only set when it changes
+        if set(self.view.selection()) != set(view_selection):
+            self.view.selection_set(view_selection)
+
+        if self.yscrollcommand:
+            self.yscrollcommand(*self._fractions())
+
+    def _schedule_render(self):
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self.refresh)
+
+    def _style_metrics(self):
+        """
+        Return the (row height, font) of the Treeview style. Tk sends <<ThemeChanged>> for theme
+        changes and for every style configure, so the lookup is cached until then.
+        """
+        if self._metrics is None:
+            style = ttk.Style()
+            row_height = int(style.lookup("Treeview", "rowheight") or 20)
+            spec = style.lookup("Treeview", "font") or "TkDefaultFont"
+            # A named font is measured live, so resizing it needs no new lookup
+            font = tkfont.nametofont(spec) if spec in tkfont.names(self) else tkfont.Font(font=spec)
+            self._metrics = (row_height, font)
+        return self._metrics
+
+    def _viewport_rows(self):
+        height = self.view.winfo_height()
+        row_height = self._style_metrics()[0]
+        heading_height = row_height if "headings" in str(self.view.cget("show")) else 0
+        return max(1, (height - heading_height) // row_height)
+
+    def _fractions(self):
+        rows = len(self.visible_rows())
+        if not rows:
+            return 0.0, 1.0
+        viewport = self._viewport_rows()
+        return self.offset / rows, min(1.0, (self.offset + viewport) / rows)
+
+    # --- Events ---------------------------------------------------------------------------------
+
+    def _on_view_select(self, event):
+        shown = set(self.slot_rows)
+        chosen = [self.slot_rows[self.pool.index(slot)] for slot in self.view.selection() if slot in self.pool[:len(self.slot_rows)]]
+        self.selected = [item for item in self.selected if item not in shown] + chosen
+        if chosen:
+            self.focused = chosen[-1]
+        # Rows rebound to other items by scrolling change the Tk selection but not the selected items
+        if tuple(self.selected) == self._announced:
+            return "break"
+        self._announced = tuple(self.selected)
+
+    def _on_theme_changed(self, event):
+        self._metrics = None
+        self._schedule_render()
+
+    def _on_click(self, event):
+        slot = self.view.identify_row(event.y)
+        if slot not in self.pool[:len(self.slot_rows)]:
+            return
+        index = self.pool.index(slot)
+        item, depth = self.visible_rows()[self.offset + index]
+        node = self.nodes[item]
+        # Like ttk.Treeview, only the indent and the arrow toggle a row; clicks on its text select it
+        if not node.children or event.x >= self._arrow_end(slot, depth):
+            return
+        node.open = not node.open
+        self.focused = item
+        self._structure_changed()
+        self.view.event_generate("<<TreeviewOpen>>" if node.open else "<<TreeviewClose>>")
+
+    def _arrow_end(self, slot, depth):
+        """
+        Return the x coordinate where the indent and arrow drawn before a row's text end.
+        :param slot: The pooled Tk row showing the row.
+        :param depth: The depth of the row in the model.
+        """
+        bbox = self.view.bbox(slot, "#0")
+        if not bbox:
+            return 0
+        x, y, width, height = bbox
+        # The text element starts after the padding Tk keeps for its own (unused) indicator
+        text_x = x
+        while text_x < x + width and "text" not in str(self.view.identify_element(text_x, y + height // 2)):
+            text_x += 1
+        font = self._style_metrics()[1]
+        return text_x + font.measure(INDENT * depth + OPEN_GLYPH)
+
+    def _on_mousewheel(self, event):
+        self._scroll_units(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _scroll_units(self, amount):
+        self.offset += amount
+        self._schedule_render()
+        return "break"
+
+    def _move_focus(self, step):
+        rows = [item for item, depth in self.visible_rows()]
+        if not rows:
+            return "break"
+        position = rows.index(self.focused) + step if self.focused in rows else 0
+        position = max(0, min(position, len(rows) - 1))
+        self.see(rows[position])
+        self.selection_set(rows[position])
+        return "break"